@@ -20,7 +20,8 @@ DATABASES = DATABASES
 
 SERVER_EMAIL = SERVER_EMAIL
 
-# Cache config
+# Cache config; use website.sharedcache.SharedFileCache to share the cache
+# between the processes on a host
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -78,7 +79,7 @@ MIDDLEWARE_CLASSES = (
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.gzip.GZipMiddleware',
+    'website.middleware.GZipMiddleware',
 )
 
 ROOT_URLCONF = 'myproject.urls'
@@ -114,5 +115,68 @@ CURRENCY_SYMBOL = u'€ '
 
 GEOS_LIBRARY_PATH = '/usr/local/lib/libgeos_c.so.1'
 
+# seconds browsers may cache the country borders served by world.views.border,
+# for requests with the current border_hash of the country
+BORDER_MAX_AGE = 60*60*24*30
+
 # api url
 API_URL = 'http://search-api-data.openaid.nl/api/data/'
+
+# backend http client: connections kept alive per host, timeouts in seconds
+API_POOL_SIZE = 25
+API_CONNECT_TIMEOUT = 5
+API_READ_TIMEOUT = 60
+
+# threads for concurrent backend calls and the time a page may wait on them
+API_WORKERS = 10
+API_DEADLINE = 30
+
+# threads for the backend calls of the project pages, so they never queue
+# behind the searches of the API_WORKERS pool
+API_DETAIL_WORKERS = 10
+
+# backend response cache, emptied when the backend's last_updated changes;
+# at most API_CACHE_SIZE responses taking API_CACHE_MAX_BYTES of memory
+API_CACHE_SIZE = 1000
+API_CACHE_MAX_BYTES = 64*1024*1024
+API_CACHE_TIMEOUTS = {
+    'activity': 60*60*24,
+    'organisation': 60*60*24,
+    'transaction': 60*60*24,
+    'policymarker': 60*60*24,
+}
+
+# seconds between checks of the backend's last_updated value; with the
+# poller enabled a background thread checks it instead of the requests
+API_FRESHNESS_INTERVAL = 60
+API_FRESHNESS_POLLER = False
+
+# fetch only the shown page of search results, using the backend's _offset
+# and _limit parameters; counts, facets and the map come from a separate
+# summary that is shared by all pages. Needs API_SUMMARY_HANDLER, without
+# it the full search is fetched as if this was off
+API_PAGINATION = False
+
+# backend handler returning only the count, facets and country totals of a
+# search (see website.activitystore.SearchSummary), for API_PAGINATION
+API_SUMMARY_HANDLER = None
+
+# answer searches and filter choices from a local index over a mirror of
+# all activities instead of the backend. The mirror groups transactions and
+# policy markers by their activity_id field, and syncs only what changed
+# with a last_updated__gt filter on /activity, /transaction and
+# /policymarker; if the backend fails those requests, it reloads everything
+SEARCH_INDEX = False
+
+# sync the mirror behind SEARCH_INDEX from a background thread every
+# API_FRESHNESS_INTERVAL seconds, instead of when a request finds it behind;
+# each sync logs its timings and lag to the website.mirror logger
+MIRROR_SYNC_WORKER = False
+
+# bytes of rendered pages, plain and gzipped, kept for anonymous visitors
+# until the backend's last_updated changes; 0 disables the page cache
+PAGE_CACHE_MAX_BYTES = 32*1024*1024
+
+# bulk exports of search results, removed after EXPORT_MAX_AGE seconds
+EXPORT_ROOT = rel('exports')
+EXPORT_MAX_AGE = 60*60*24
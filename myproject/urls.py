@@ -6,6 +6,7 @@ admin.autodiscover()
 
 urlpatterns = patterns('',
     (r'^', include('myproject.website.urls')),
+    (r'^', include('myproject.world.urls')),
 
     (r'^admin/', include(admin.site.urls)),
     
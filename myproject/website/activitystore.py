@@ -0,0 +1,225 @@
+"""
+Compact storage of the activity lists returned by backend searches.
+"""
+from array import array
+from decimal import Decimal
+
+# the activity fields the views use, the rest of a backend activity is dropped
+FIELDS = ('id', 'title', 'description', 'recipient_country_code', 'start_actual', 'total_budget', 'sector', 'sector_code')
+
+
+class InternTable(object):
+    """
+    Stores each distinct value once; rows refer to it by index.
+    """
+    def __init__(self):
+        self.values = []
+        self.indexes = {}
+
+    def index(self, value):
+        try:
+            return self.indexes[value]
+        except KeyError:
+            self.indexes[value] = len(self.values)
+            self.values.append(value)
+            return self.indexes[value]
+
+
+class ActivityColumns(object):
+    def __init__(self):
+        self.ids = array('l')
+        self.titles = []
+        self.descriptions = []
+        self.countries = InternTable()
+        self.country_refs = array('i')
+        # (sector_code, sector) pairs
+        self.sectors = InternTable()
+        self.sector_refs = array('i')
+        self.start_dates = InternTable()
+        self.start_date_refs = array('i')
+        self.budget_cents = array('l')
+
+    def append(self, activity):
+        self.ids.append(int(activity['id']))
+        self.titles.append(activity['title'])
+        self.descriptions.append(activity['description'])
+        self.country_refs.append(self.countries.index(activity['recipient_country_code']))
+        self.sector_refs.append(self.sectors.index((activity['sector_code'], activity['sector'])))
+        self.start_date_refs.append(self.start_dates.index(activity['start_actual']))
+        self.budget_cents.append(int(Decimal(unicode(activity['total_budget'])).scaleb(2).to_integral_value()))
+
+
+class ActivityStore(object):
+    """
+    A list of activities stored by column: budgets as integer cents, and
+    country codes, sectors and start dates interned. It takes a fraction of
+    the memory of the parsed JSON dicts.
+
+    The rows of a store are never modified once built, so all threads share
+    the cached one. Sorting returns a view on the same columns. Indexing and
+    iterating give ActivityRow objects that read like the original dicts.
+
+    ActivityIndex.updated appends rows to the columns of the mirror's index;
+    a store with an order only ever reads its own rows, so views on those
+    columns are not affected.
+    """
+    def __init__(self, columns, order=None):
+        self.columns = columns
+        self.order = order
+
+    @classmethod
+    def from_dicts(cls, activities):
+        columns = ActivityColumns()
+        for activity in activities:
+            columns.append(activity)
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.order if self.order is not None else self.columns.ids)
+
+    def __iter__(self):
+        columns = self.columns
+        for i in (self.order if self.order is not None else xrange(len(columns.ids))):
+            yield ActivityRow(columns, i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if self.order is not None:
+                return [ActivityRow(self.columns, i) for i in self.order[index]]
+            return [ActivityRow(self.columns, i) for i in xrange(*index.indices(len(self)))]
+        return ActivityRow(self.columns, self.indexes()[index])
+
+    def indexes(self):
+        """
+        Returns the column rows of this store, in order.
+        """
+        return self.order if self.order is not None else xrange(len(self.columns.ids))
+
+    def sorted_by_country(self, name, reverse=False):
+        """
+        Returns a view sorted on name(country code); `name` is called once
+        per distinct country.
+        """
+        columns = self.columns
+        names = [name(code) for code in columns.countries.values]
+        refs = columns.country_refs
+        order = sorted(self.indexes(), key=lambda i: names[refs[i]], reverse=reverse)
+        return ActivityStore(columns, array('l', order))
+
+    def country_totals(self):
+        """
+        Returns {country code: (number of activities, total budget)}.
+        """
+        columns = self.columns
+        counts = [0] * len(columns.countries.values)
+        cents = [0] * len(columns.countries.values)
+        refs = columns.country_refs
+        budget_cents = columns.budget_cents
+        for i in self.indexes():
+            ref = refs[i]
+            counts[ref] += 1
+            cents[ref] += budget_cents[i]
+        return dict(
+            (code, (counts[ref], Decimal(cents[ref]).scaleb(-2)))
+            for ref, code in enumerate(columns.countries.values) if code and counts[ref]
+        )
+
+    def facets(self):
+        """
+        Returns the countries, (sector code, sector) pairs and largest budget.
+        """
+        columns = self.columns
+        country_refs = set()
+        sector_refs = set()
+        largest = 0
+        for i in self.indexes():
+            country_refs.add(columns.country_refs[i])
+            sector_refs.add(columns.sector_refs[i])
+            if columns.budget_cents[i] > largest:
+                largest = columns.budget_cents[i]
+        countries = set(columns.countries.values[ref] for ref in country_refs)
+        sectors = set(columns.sectors.values[ref] for ref in sector_refs)
+        return dict(
+            countries=set(code for code in countries if code),
+            sectors=set(sector for sector in sectors if sector[1]),
+            largest_budget=Decimal(largest).scaleb(-2),
+        )
+
+
+class ActivityRow(object):
+    """
+    One activity of an ActivityStore, read like the original activity dict.
+    """
+    __slots__ = ('columns', 'i')
+
+    def __init__(self, columns, i):
+        self.columns = columns
+        self.i = i
+
+    def __getitem__(self, field):
+        columns, i = self.columns, self.i
+        if field == 'id':
+            return columns.ids[i]
+        elif field == 'title':
+            return columns.titles[i]
+        elif field == 'description':
+            return columns.descriptions[i]
+        elif field == 'recipient_country_code':
+            return columns.countries.values[columns.country_refs[i]]
+        elif field == 'start_actual':
+            return columns.start_dates.values[columns.start_date_refs[i]]
+        elif field == 'total_budget':
+            cents = columns.budget_cents[i]
+            return u'%s%d.%02d' % (u'-' if cents < 0 else u'', abs(cents) // 100, abs(cents) % 100)
+        elif field == 'sector_code':
+            return columns.sectors.values[columns.sector_refs[i]][0]
+        elif field == 'sector':
+            return columns.sectors.values[columns.sector_refs[i]][1]
+        raise KeyError(field)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(FIELDS)
+
+
+class SearchSummary(object):
+    """
+    The number of results of a search with their facets and totals per
+    country, as returned by the backend's summary handler:
+
+        {"count": 2,
+         "countries": {"ML": {"count": 2, "total_budget": "1500.00"}},
+         "sectors": [{"sector_code": "11220", "sector": "Basic education"}],
+         "largest_budget": "1000.00"}
+
+    It answers len(), facets() and country_totals() like an ActivityStore
+    of the results would, without the results themselves.
+    """
+    def __init__(self, summary):
+        self.size = int(summary['count'])
+        self.totals = dict(
+            (code, (int(total['count']), Decimal(unicode(total['total_budget']))))
+            for code, total in summary['countries'].items() if code
+        )
+        self.sectors = set(
+            (sector['sector_code'], sector['sector']) for sector in summary['sectors'] if sector['sector']
+        )
+        self.largest_budget = Decimal(unicode(summary['largest_budget'] or 0))
+
+    def __len__(self):
+        return self.size
+
+    def country_totals(self):
+        return dict(self.totals)
+
+    def facets(self):
+        return dict(
+            countries=set(self.totals),
+            sectors=set(self.sectors),
+            largest_budget=self.largest_budget,
+        )
@@ -0,0 +1,165 @@
+"""
+In-process cache of decoded backend responses.
+
+Entries are keyed on the normalized handler and query, expire after a
+per-handler timeout and are evicted least recently used first once the
+cache holds `maxsize` entries or their payloads take more than
+`max_bytes`. All entries belong to one generation of the backend data:
+when a newer last_updated value comes in the whole cache is dropped, and
+responses fetched under an older one are not stored.
+
+Concurrent misses of the same entry are coalesced by SingleFlight, so only
+one of the threads fetches it.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from website.conditional import token_time
+from website.utils import deep_size
+
+
+def token_order(token):
+    # last_updated values compare as dates whatever their format, any
+    # other tokens as strings
+    return token_time(token), token
+
+
+class ResponseCache(object):
+    def __init__(self, maxsize=1000, timeouts=None, default_timeout=60*60, max_bytes=64*1024*1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.entries = OrderedDict()
+        self.token = None
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def key(self, handler, query):
+        """
+        'activity/12' and 'activity/12/' are the same handler and the order
+        of the query parameters or of list values doesn't matter.
+        """
+        items = []
+        for k, v in query.items():
+            if isinstance(v, (list, tuple)):
+                v = tuple(sorted(v))
+            items.append((k, v))
+        return handler.strip('/'), tuple(sorted(items))
+
+    def timeout_for(self, handler):
+        # 'activity/12/' uses the timeout of 'activity'
+        return self.timeouts.get(handler.strip('/').split('/')[0], self.default_timeout)
+
+    def validate(self, token):
+        """
+        Drops all entries if `token` is newer than the one they were stored
+        with. A request that still has an older token leaves them alone.
+        """
+        with self.lock:
+            if token_order(token) > token_order(self.token):
+                self.entries.clear()
+                self.size = 0
+                self.token = token
+
+    def get(self, handler, query):
+        key = self.key(handler, query)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    self.size -= entry[2]
+                self.misses += 1
+                return None
+            # re-insert to mark as most recently used
+            self.entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def set(self, handler, query, value, token, size=None):
+        """
+        Stores `value`, of `size` bytes, fetched when the backend data was at
+        `token`; by default its size is measured. A value of another
+        generation than the cache's is dropped.
+        """
+        key = self.key(handler, query)
+        expires = time.time() + self.timeout_for(handler)
+        if size is None:
+            size = deep_size(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if token != self.token:
+                return
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            self.entries[key] = (expires, value, size)
+            self.size += size
+            while len(self.entries) > self.maxsize or self.size > self.max_bytes:
+                self.size -= self.entries.popitem(last=False)[1][2]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.token = None
+
+
+class SingleFlight(object):
+    """
+    Runs `func` once for all concurrent calls with the same key; the other
+    callers wait and get its result, or its exception.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.calls_made = self.deduplicated = 0
+
+    def do(self, key, func):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.calls_made += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error[0], call.error[1], call.error[2]
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except:
+            call.error = sys.exc_info()
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+response_cache = ResponseCache(
+    maxsize=getattr(settings, 'API_CACHE_SIZE', 1000),
+    max_bytes=getattr(settings, 'API_CACHE_MAX_BYTES', 64*1024*1024),
+    timeouts=getattr(settings, 'API_CACHE_TIMEOUTS', {}),
+)
+
+in_flight = SingleFlight()
@@ -0,0 +1,246 @@
+"""
+HTTP client for the calls to the backend API.
+
+Connections are kept alive and pooled per host, so the mod_wsgi threads
+don't pay for a new TCP connection and DNS lookup on every backend request.
+"""
+import httplib
+import socket
+import threading
+import time
+import zlib
+from multiprocessing.pool import ThreadPool
+from Queue import Queue, Empty
+from urlparse import urlsplit, urljoin
+
+from django.conf import settings
+
+
+class BackendError(Exception):
+    pass
+
+
+class ConnectionPool(object):
+    """
+    Keeps at most `maxsize` connections to a single host.
+
+    Threads asking for a connection while all of them are in use wait for
+    one to be released, up to `connect_timeout` seconds.
+    """
+    def __init__(self, scheme, host, maxsize, connect_timeout):
+        self.connection_class = httplib.HTTPSConnection if scheme == 'https' else httplib.HTTPConnection
+        self.host = host
+        self.connect_timeout = connect_timeout
+        self.idle = Queue()
+        self.slots = threading.BoundedSemaphore(maxsize)
+        self.connections_made = 0
+
+    def get(self):
+        # threading.Semaphore.acquire has no timeout in python 2, so poll
+        waited = 0.0
+        while not self.slots.acquire(False):
+            if waited >= self.connect_timeout:
+                raise BackendError('No free connection to %s' % self.host)
+            time.sleep(0.01)
+            waited += 0.01
+        try:
+            return self.idle.get_nowait()
+        except Empty:
+            return self._new_connection()
+
+    def put(self, connection, reuse=True):
+        if reuse:
+            self.idle.put(connection)
+        else:
+            connection.close()
+        self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except Empty:
+                break
+
+    def _new_connection(self):
+        connection = self.connection_class(self.host, timeout=self.connect_timeout)
+        self.connections_made += 1
+        return connection
+
+
+class HttpClient(object):
+    """
+    Thread-safe client doing GET requests over pooled connections.
+
+    Responses are requested gzipped and transparently decompressed.
+    """
+    max_redirects = 5
+
+    def __init__(self, maxsize=10, connect_timeout=5, read_timeout=60):
+        self.maxsize = maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        """
+        Returns the body of `url`, following redirects.
+        """
+        for i in range(self.max_redirects + 1):
+            status, headers, body = self._request(url)
+            if status in (301, 302, 303, 307) and headers.get('location'):
+                url = urljoin(url, headers['location'])
+                continue
+            if status >= 400:
+                raise BackendError('%s returned %s' % (url, status))
+            return body
+        raise BackendError('Too many redirects for %s' % url)
+
+    def stream(self, url, chunk_size=64 * 1024):
+        """
+        Like `get`, but returns an iterator over the body, which is read
+        and decompressed as it is consumed.
+        """
+        for i in range(self.max_redirects + 1):
+            response, release = self._open(url)
+            status, headers = response.status, dict(response.getheaders())
+            redirect = status in (301, 302, 303, 307) and headers.get('location')
+            if redirect or status >= 400:
+                # read the body, so the connection can be reused
+                self._read(url, response, release)
+            if redirect:
+                url = urljoin(url, headers['location'])
+                continue
+            if status >= 400:
+                raise BackendError('%s returned %s' % (url, status))
+            return self._chunks(url, response, release, chunk_size)
+        raise BackendError('Too many redirects for %s' % url)
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+        with self.lock:
+            for pool in self.pools.values():
+                pool.close()
+
+    def pool_for(self, scheme, host):
+        with self.lock:
+            if (scheme, host) not in self.pools:
+                self.pools[scheme, host] = ConnectionPool(
+                    scheme, host, self.maxsize, self.connect_timeout)
+            return self.pools[scheme, host]
+
+    def _request(self, url):
+        response, release = self._open(url)
+        body = self._read(url, response, release)
+        headers = dict(response.getheaders())
+        if headers.get('content-encoding') == 'gzip':
+            try:
+                body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            except zlib.error, e:
+                raise BackendError('%s: %s' % (url, e))
+        return response.status, headers, body
+
+    def _open(self, url):
+        """
+        Sends the request, returns the response with its body still unread
+        and a function to give the connection back to the pool once it is.
+        """
+        scheme, host, path, query, fragment = urlsplit(url)
+        if query:
+            path += '?' + query
+        pool = self.pool_for(scheme, host)
+
+        # a kept-alive connection may have been closed by the server in the
+        # meantime, so a failure on a reused connection is retried once
+        for attempt in (1, 2):
+            connection = pool.get()
+            reused = connection.sock is not None
+            try:
+                if not reused:
+                    connection.connect()
+                connection.sock.settimeout(self.read_timeout)
+                connection.request('GET', path or '/', headers={'Accept-Encoding': 'gzip'})
+                response = connection.getresponse()
+            except (httplib.HTTPException, socket.error), e:
+                pool.put(connection, reuse=False)
+                if reused and attempt == 1:
+                    continue
+                raise BackendError('%s: %s' % (url, e))
+            break
+
+        def release(complete):
+            pool.put(connection, reuse=complete and not response.will_close)
+        return response, release
+
+    def _read(self, url, response, release):
+        try:
+            body = response.read()
+        except (httplib.HTTPException, socket.error), e:
+            release(False)
+            raise BackendError('%s: %s' % (url, e))
+        release(True)
+        return body
+
+    def _chunks(self, url, response, release, chunk_size):
+        decompressor = None
+        if response.getheader('content-encoding') == 'gzip':
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        complete = False
+        try:
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                if decompressor is not None:
+                    chunk = decompressor.decompress(chunk)
+                if chunk:
+                    yield chunk
+            if decompressor is not None:
+                chunk = decompressor.flush()
+                if chunk:
+                    yield chunk
+            complete = True
+        except (httplib.HTTPException, socket.error, zlib.error), e:
+            raise BackendError('%s: %s' % (url, e))
+        finally:
+            # a partly read response leaves the connection unusable
+            release(complete)
+
+
+client = HttpClient(
+    maxsize=getattr(settings, 'API_POOL_SIZE', 10),
+    connect_timeout=getattr(settings, 'API_CONNECT_TIMEOUT', 5),
+    read_timeout=getattr(settings, 'API_READ_TIMEOUT', 60),
+)
+
+
+# threads of the pools run_async_on uses, by name
+POOL_SIZES = {
+    'default': getattr(settings, 'API_WORKERS', 10),
+    'detail': getattr(settings, 'API_DETAIL_WORKERS', 10),
+}
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+def run_async(func, *args, **kwargs):
+    """
+    Runs `func` on a shared thread pool, returns a multiprocessing AsyncResult.
+    
+    Used to issue independent backend calls concurrently.
+    """
+    return run_async_on('default', func, *args, **kwargs)
+
+def run_async_on(pool, func, *args, **kwargs):
+    """
+    Like `run_async`, on the thread pool named `pool`, so that calls on
+    one pool never queue behind those on another.
+    """
+    with _workers_lock:
+        workers = _workers.get(pool)
+        if workers is None:
+            workers = _workers[pool] = ThreadPool(POOL_SIZES[pool])
+    return workers.apply_async(func, args, kwargs)
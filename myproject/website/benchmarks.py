@@ -0,0 +1,229 @@
+"""
+Micro-benchmarks for the hot paths of a search request.
+
+Run them with "manage.py benchmark [name ...]".
+"""
+import random
+import re
+import string
+import timeit
+from decimal import Decimal
+
+from django.template import Template, Context
+from django.utils import simplejson
+
+from website.templatetags.cur import formatter
+from website.activitystore import ActivityStore, FIELDS
+from website.countries import CountryRegistry
+from world.snapshot import BorderSnapshot
+from website.index import ActivityIndex
+from website.utils import deep_size
+from website.utils import iter_json_array
+from website.countries import country_matcher, country_registry, strip_accents
+from website.iso_country_code import COUNTRY, COUNTRY_REVERSED
+
+QUERIES = [
+    u'water',
+    u'education in Mali and Burkina Faso',
+    u'sant\xe9 C\xf4te d\'Ivoire Democratic Republic of the Congo',
+]
+
+
+def timed(func, number):
+    """
+    Returns the time per call of `func` in microseconds.
+    """
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+def bench_country_matching(number=200):
+    def per_country_regexes():
+        # the way the forms matched countries before the CountryMatcher
+        for query in QUERIES:
+            data = strip_accents(query)
+            for country in COUNTRY.keys():
+                pattern = re.compile(re.escape(strip_accents(country)), re.IGNORECASE)
+                if pattern.search(data):
+                    data = pattern.sub('', data, count=1)
+
+    def matcher():
+        for query in QUERIES:
+            country_matcher.match(query)
+
+    return [
+        ('per-country regexes', timed(per_country_regexes, number) / len(QUERIES)),
+        ('country matcher', timed(matcher, number) / len(QUERIES)),
+    ]
+
+
+def fake_activities(count):
+    codes = sorted(COUNTRY_REVERSED) + [None]
+    return [dict(
+        id=i,
+        title=u'Activity %s' % i,
+        description=u'Description of activity %s' % i,
+        recipient_country_code=codes[i % len(codes)],
+        start_actual=u'2010-01-%02d' % (i % 28 + 1),
+        total_budget=u'%s.00' % (i * 1234),
+        sector=u'Basic education',
+        sector_code=u'11220',
+    ) for i in range(count)]
+
+
+def bench_country_lookups(number=5, rows=10000):
+    activities = fake_activities(rows)
+    names = [COUNTRY_REVERSED.get(a['recipient_country_code'], u'Mali') for a in activities]
+
+    def rebuilt_dict():
+        # the way country_to_iso looked names up before the CountryRegistry
+        for name in names:
+            countries = dict(zip(map(string.lower, COUNTRY.keys()), COUNTRY.values()))
+            countries.get(name.lower(), "Unknown")
+
+    def registry():
+        for name in names:
+            country_registry.to_iso(name)
+
+    template = Template(
+        '{% load country %}{% for activity in activities %}'
+        '{{ activity.recipient_country_code|iso_to_country|default:"Unspecified" }}'
+        '{% endfor %}'
+    )
+    context = Context(dict(activities=activities))
+
+    return [
+        ('country_to_iso, rebuilt dict x%s' % rows, timed(rebuilt_dict, number)),
+        ('country_to_iso, registry x%s' % rows, timed(registry, number)),
+        ('render %s rows' % rows, timed(lambda: template.render(context), number)),
+    ]
+
+
+def bench_currency(number=5, rows=10000):
+    budgets = [activity['total_budget'] for activity in fake_activities(rows)]
+
+    def recursive_grouping():
+        # the way the currency filter formatted amounts before the CurrencyFormatter
+        for value in budgets:
+            intstr = str(int(Decimal(value)))
+            f = lambda x, n, acc=[]: f(x[:-n], n, [(x[-n:])]+acc) if x else acc
+            "%s%s" % ('$', ','.join(f(intstr, 3)))
+
+    def per_row():
+        for value in budgets:
+            formatter.format(value)
+
+    return [
+        ('recursive grouping x%s' % rows, timed(recursive_grouping, number)),
+        ('formatter per row x%s' % rows, timed(per_row, number)),
+        ('formatter column x%s' % rows, timed(lambda: formatter.format_column(budgets), number)),
+    ]
+
+
+def bench_activity_store(number=5, rows=10000):
+    from website.forms import scan_facets
+    activities = fake_activities(rows)
+    store = ActivityStore.from_dicts(activities)
+
+    def dict_totals():
+        # the way the map totals were summed before the ActivityStore
+        totals = {}
+        for project in activities:
+            iso = project['recipient_country_code']
+            if iso:
+                count, budget = totals.get(iso, (0, 0))
+                totals[iso] = (count + 1, budget + Decimal(project['total_budget']))
+
+    def dict_sort():
+        sorted(activities, key=lambda activity: COUNTRY_REVERSED.get(activity['recipient_country_code'], u''))
+
+    def store_sort():
+        store.sorted_by_country(lambda iso: COUNTRY_REVERSED.get(iso, u''))
+
+    return [
+        ('dicts, bytes per activity', deep_size(activities) / float(rows), 'B'),
+        ('store, bytes per activity', deep_size(store) / float(rows), 'B'),
+        ('build store x%s' % rows, timed(lambda: ActivityStore.from_dicts(activities), number)),
+        ('dicts, facets x%s' % rows, timed(lambda: scan_facets(activities), number)),
+        ('store, facets x%s' % rows, timed(store.facets, number)),
+        ('dicts, country totals x%s' % rows, timed(dict_totals, number)),
+        ('store, country totals x%s' % rows, timed(store.country_totals, number)),
+        ('dicts, sort by country x%s' % rows, timed(dict_sort, number)),
+        ('store, sort by country x%s' % rows, timed(store_sort, number)),
+    ]
+
+
+def bench_search_index(number=20, rows=20000):
+    activities = fake_activities(rows)
+    borders = BorderSnapshot([dict(iso2=iso, subregion=0) for iso in COUNTRY_REVERSED])
+    registry = CountryRegistry(COUNTRY, COUNTRY_REVERSED, borders)
+    index = ActivityIndex(ActivityStore.from_dicts(activities), registry)
+    filters = dict(query=u'activity 12', countries=['ML', 'BF', 'NE'], budget='10000')
+
+    return [
+        ('build index x%s' % rows, timed(lambda: ActivityIndex(index.store, registry), 1)),
+        ('keyword search', timed(lambda: index.search(query=u'activity 12'), number)),
+        ('filtered search by budget', timed(lambda: index.search(order_by='-total_budget', **filters), number)),
+        ('facets of 3 filters', timed(lambda: index.facets(('countries', 'budget', 'sectors'), **filters), number)),
+    ]
+
+
+def bench_json_decode(number=3, rows=10000):
+    activities = fake_activities(rows)
+    for activity in activities:
+        # fields of a backend activity the views don't use
+        activity.update(identifier=u'NL-1-%s' % activity['id'], default_aid_type=u'Project-type interventions',
+                        collaboration_type=u'Bilateral', activity_status=u'Implementation')
+    body = simplejson.dumps(activities)
+    chunks = [body[i:i + 64 * 1024] for i in range(0, len(body), 64 * 1024)]
+
+    return [
+        ('loads, then store x%s' % rows, timed(lambda: ActivityStore.from_dicts(simplejson.loads(body)), number)),
+        ('streamed into store x%s' % rows,
+         timed(lambda: ActivityStore.from_dicts(iter_json_array(chunks, fields=FIELDS)), number)),
+    ]
+
+
+def bench_locate(number=1, points=2000):
+    from django.contrib.gis.geos import Point
+    from world.locator import country_locator
+    from world.models import WorldBorder
+    rng = random.Random(0)
+    lonlats = [(rng.uniform(-180, 180), rng.uniform(-60, 75)) for i in range(points)]
+    country_locator.get()
+
+    def orm():
+        # the way points were resolved before the CountryLocator
+        for lon, lat in lonlats:
+            list(WorldBorder.objects.filter(mpoly__contains=Point(lon, lat, srid=4326)).values_list('iso2', flat=True)[:1])
+
+    return [
+        ('ORM query per point x%s' % points, timed(orm, number)),
+        ('locator x%s' % points, timed(lambda: country_locator.locate_many(lonlats), number)),
+    ]
+
+
+def bench_page_cache(number=100, rows=15):
+    from django.http import HttpResponse
+    from django.utils.text import compress_string
+    from website.pagecache import CachedPage
+    # about the size of a search page with its map script and filters
+    html = ''.join('<tr><td>%(title)s</td><td>%(recipient_country_code)s</td><td>%(total_budget)s</td></tr>' % activity
+                   for activity in fake_activities(rows)) * 40
+    page = CachedPage(HttpResponse(html))
+
+    return [
+        ('gzip per response, %s bytes' % len(html), timed(lambda: compress_string(html), number)),
+        ('cached gzipped page', timed(lambda: page.response(gzip=True), number)),
+    ]
+
+
+BENCHMARKS = {
+    'activity_store': bench_activity_store,
+    'countries': bench_country_matching,
+    'country_lookups': bench_country_lookups,
+    'currency': bench_currency,
+    'json_decode': bench_json_decode,
+    'locate': bench_locate,
+    'page_cache': bench_page_cache,
+    'search_index': bench_search_index,
+}
@@ -0,0 +1,91 @@
+"""
+Conditional GET for pages that only depend on the query and the backend's
+last_updated value.
+
+The ETag is a hash of both, and Last-Modified is the last_updated value
+itself, so a browser or proxy revalidating a page gets a 304 until the
+backend data changes, without the page being searched or rendered again.
+Pages missing data, or made from data older than last_updated, get no
+validators, so they are never revalidated.
+"""
+import calendar
+import re
+from datetime import datetime
+
+from django.http import HttpResponseNotModified
+from django.utils.hashcompat import md5_constructor
+from django.utils.http import http_date, parse_http_date_safe
+
+# formats of the backend's last_updated value
+TOKEN_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d')
+
+# GZipMiddleware may mark the ETag of a compressed response
+_gzip_suffix = re.compile(r';gzip"$')
+
+
+def canonical_query(querydict):
+    """
+    Returns the parameters of `querydict` as a sorted tuple, the same for
+    any order of the parameters in the URL.
+    """
+    return tuple(sorted((key, tuple(querydict.getlist(key))) for key in querydict))
+
+def etag_for(*parts):
+    return '"%s"' % md5_constructor(repr(parts)).hexdigest()
+
+def token_time(token):
+    """
+    Returns the last_updated value as a timestamp, None if it isn't a date.
+    """
+    value = (token or u'').split('.')[0].strip()
+    for format in TOKEN_FORMATS:
+        try:
+            return calendar.timegm(datetime.strptime(value, format).timetuple())
+        except ValueError:
+            pass
+    return None
+
+def is_not_modified(request, etag, last_modified=None):
+    """
+    Returns whether the client's copy, as told by If-None-Match or else
+    If-Modified-Since, is still current.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        etags = [_gzip_suffix.sub('"', value.strip()) for value in if_none_match.split(',')]
+        return etag in etags or '*' in etags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE'))
+    return last_modified is not None and if_modified_since is not None and if_modified_since >= last_modified
+
+def set_validators(response, etag, last_modified=None):
+    # a response with validators of its own, like a served export, keeps them
+    if not response.has_header('ETag'):
+        response['ETag'] = etag
+    if last_modified is not None and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin(object):
+    """
+    Answers GET requests the client already has the current version of with
+    a 304, before anything else is done for them.
+
+    The view must have the `last_updated` and `is_current` methods of
+    ApiMixin.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return super(ConditionalGetMixin, self).dispatch(request, *args, **kwargs)
+        etag = self.get_etag(request, *args, **kwargs)
+        last_modified = token_time(self.last_updated())
+        if is_not_modified(request, etag, last_modified):
+            return set_validators(HttpResponseNotModified(), etag, last_modified)
+        response = super(ConditionalGetMixin, self).dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and self.is_current():
+            set_validators(response, etag, last_modified)
+        return response
+
+    def get_etag(self, request, *args, **kwargs):
+        return etag_for(self.__class__.__name__, self.last_updated(), canonical_query(request.GET),
+                        sorted(kwargs.items()))
@@ -0,0 +1,97 @@
+"""
+Country lookups built once at import time.
+"""
+import re
+import unicodedata
+
+from website.iso_country_code import COUNTRY, COUNTRY_REVERSED
+
+
+def strip_accents(s):
+    return ''.join(c for c in unicodedata.normalize('NFD', s) if not unicodedata.combining(c))
+
+def fold(name):
+    return strip_accents(name).lower()
+
+
+class CountryRegistry(object):
+    """
+    Lookups between country names, ISO codes and subregions.
+
+    Names are looked up ignoring case and accents. The subregions come
+    from `borders`, by default the snapshot of the WorldBorder table.
+    """
+    def __init__(self, countries, names, borders=None):
+        self._codes = dict((fold(name), iso) for name, iso in countries.items())
+        self._names = dict(names)
+        self.borders = borders
+
+    def to_iso(self, name, default=None):
+        # most names have no accents, so skip the normalization for those
+        iso = self._codes.get(name.lower())
+        if iso is None:
+            iso = self._codes.get(fold(name), default)
+        return iso
+
+    def to_name(self, iso, default=u''):
+        if not iso:
+            return default
+        return self._names.get(iso.upper(), default)
+
+    def subregions_of(self, codes):
+        """
+        Returns the set of subregions the countries with ISO `codes` are in.
+        """
+        borders = self._borders()
+        subregions = set(borders.subregion_of(iso) for iso in codes)
+        subregions.discard(None)
+        return subregions
+
+    def countries_in(self, subregions):
+        """
+        Returns the set of ISO codes of the countries in `subregions`.
+        """
+        borders = self._borders()
+        codes = set()
+        for subregion in subregions:
+            codes.update(borders.countries_in(int(subregion)))
+        return codes
+
+    def _borders(self):
+        if self.borders is None:
+            from world.snapshot import borders
+            return borders
+        return self.borders
+
+
+class CountryMatcher(object):
+    """
+    Finds country names in a search query.
+
+    All names are compiled into one alternation, longest first, so a
+    single scan finds every name and "Nigeria" doesn't also match "Niger".
+    Matching ignores case and accents.
+    """
+    def __init__(self, countries):
+        self.codes = {}
+        for name, iso in countries.items():
+            self.codes[fold(name)] = iso
+        names = sorted(self.codes, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(re.escape(name) for name in names), re.IGNORECASE | re.UNICODE)
+
+    def match(self, query):
+        """
+        Returns the ISO codes of the countries in `query`, in order of
+        appearance, and the accent-stripped query without them.
+        """
+        query = strip_accents(query)
+        codes = []
+        for match in self.pattern.finditer(query):
+            iso = self.codes[match.group().lower()]
+            if iso not in codes:
+                codes.append(iso)
+        return codes, ' '.join(self.pattern.sub('', query).split())
+
+
+country_matcher = CountryMatcher(COUNTRY)
+country_registry = CountryRegistry(COUNTRY, COUNTRY_REVERSED)
@@ -0,0 +1,229 @@
+"""
+Bulk exports of search results as CSV, JSON Lines or XLSX.
+
+Exports are written to EXPORT_ROOT under a name derived from the search
+and the backend's last_updated value, so a repeat download is served from
+disk, with support for range requests.
+"""
+import os
+import re
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import simplejson
+from django.utils.hashcompat import md5_constructor
+
+from website.utils import UnicodeCSVStream
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+CHUNK_SIZE = 64 * 1024
+
+
+def export_root():
+    root = getattr(settings, 'EXPORT_ROOT', os.path.join(tempfile.gettempdir(), 'openaid-exports'))
+    if not os.path.isdir(root):
+        os.makedirs(root)
+    return root
+
+def export_path(signature, format):
+    return os.path.join(export_root(), '%s.%s' % (md5_constructor(signature).hexdigest(), format))
+
+def prune_exports():
+    """
+    Removes exports older than EXPORT_MAX_AGE seconds.
+    """
+    root = export_root()
+    oldest = time.time() - getattr(settings, 'EXPORT_MAX_AGE', 60*60*24)
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.getmtime(path) < oldest:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def csv_chunks(rows):
+    return UnicodeCSVStream(chunk_size=CHUNK_SIZE).iterrows(rows)
+
+def jsonl_chunks(records):
+    lines = []
+    size = 0
+    for record in records:
+        line = simplejson.dumps(record) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield ''.join(lines)
+
+
+def _temporary_file(path):
+    fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    return os.fdopen(fd, 'wb'), temporary_path
+
+def tee(chunks, path):
+    """
+    Yields `chunks` while writing them to `path`. The file only appears
+    once all chunks are written, so an aborted download leaves nothing.
+    """
+    f, temporary_path = _temporary_file(path)
+    try:
+        for chunk in chunks:
+            f.write(chunk)
+            yield chunk
+        f.close()
+        os.rename(temporary_path, path)
+        prune_exports()
+    finally:
+        if not f.closed:
+            f.close()
+            os.remove(temporary_path)
+
+def write_chunks(path, chunks):
+    for chunk in tee(chunks, path):
+        pass
+
+def write_xlsx(path, rows):
+    """
+    Writes `rows` of unicode strings as the only sheet of an XLSX workbook.
+
+    The sheet is written to disk row by row before it is zipped.
+    """
+    f, sheet_path = _temporary_file(path)
+    try:
+        f.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+        for row in rows:
+            f.write('<row>')
+            for cell in row:
+                if cell is not None:
+                    f.write('<c t="inlineStr"><is><t>%s</t></is></c>' % _xml_text(cell))
+                else:
+                    f.write('<c/>')
+            f.write('</row>')
+        f.write('</sheetData></worksheet>')
+        f.close()
+
+        z, temporary_path = _temporary_file(path)
+        z.close()
+        workbook = zipfile.ZipFile(temporary_path, 'w', zipfile.ZIP_DEFLATED)
+        for name, content in XLSX_PARTS:
+            workbook.writestr(name, content)
+        workbook.write(sheet_path, 'xl/worksheets/sheet1.xml')
+        workbook.close()
+        os.rename(temporary_path, path)
+        prune_exports()
+    finally:
+        if not f.closed:
+            f.close()
+        os.remove(sheet_path)
+
+# characters that are not allowed in XML
+_invalid_xml = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def _xml_text(value):
+    return escape(_invalid_xml.sub(u'', unicode(value))).encode('utf-8')
+
+XLSX_PARTS = (
+    ('[Content_Types].xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ('_rels/.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+     '</Relationships>'),
+    ('xl/workbook.xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+     'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+     '<sheets><sheet name="Search results" sheetId="1" r:id="rId1"/></sheets>'
+     '</workbook>'),
+    ('xl/_rels/workbook.xml.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+     '</Relationships>'),
+)
+
+
+def streaming_response(chunks, format, filename, status=200):
+    response = HttpResponse(chunks, mimetype=EXPORT_FORMATS[format], status=status)
+    response['Content-Disposition'] = 'attachment; filename=%s' % filename
+    response.streaming = True
+    return response
+
+def serve_export(request, path, format, filename):
+    """
+    Serves a finished export, answering conditional and range requests.
+    """
+    size = os.path.getsize(path)
+    etag = '"%s"' % os.path.basename(path)
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        return HttpResponseNotModified()
+
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */%s' % size
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    response = streaming_response(read_file(path, start, end - start + 1), format, filename, status=206 if byte_range else 200)
+    if byte_range:
+        response['Content-Range'] = 'bytes %s-%s/%s' % (start, end, size)
+    response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
+
+def parse_range(header, size):
+    """
+    Returns the (first, last) byte of a single range "Range" header, None
+    to send the whole file or 'unsatisfiable'.
+    """
+    match = re.match(r'^bytes=(\d*)-(\d*)$', header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        first = int(first)
+        last = min(int(last), size - 1) if last else size - 1
+    else:
+        # the last N bytes
+        first = max(size - int(last), 0)
+        last = size - 1
+    if first > last or first >= size:
+        return 'unsatisfiable'
+    return first, last
+
+def read_file(path, offset, length):
+    f = open(path, 'rb')
+    try:
+        f.seek(offset)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
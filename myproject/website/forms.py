@@ -1,38 +1,88 @@
 # coding=utf-8
 from decimal import Decimal
 import itertools
-import unicodedata
-import re
 
 from django.forms.widgets import RadioFieldRenderer
 from django import forms
 from django.utils.encoding import force_unicode
 from django.utils.safestring import mark_safe
 
-from website.templatetags.country import iso_to_country, country_to_iso
-from website.templatetags.cur import currency
-from world.models import WorldBorder
-from website.iso_country_code import SUBREGIONS, COUNTRY
+from website.templatetags.country import iso_to_country
+from website.templatetags.cur import currency_column
+from website.iso_country_code import SUBREGIONS
+from website.countries import country_matcher, country_registry
 from website.widgets import FilterWidget
 from website.fields import DynamicMultipleChoiceField, DynamicChoiceField
+from website.backend import run_async
+from website.activitystore import ActivityStore, SearchSummary
+
+# filters whose choices are based on a search without the filter itself
+FACET_FILTERS = ('countries', 'budget', 'sectors')
 
 
 class SearchForm(forms.Form):
     query = forms.CharField(required=False,label='',widget=forms.TextInput(attrs={'class':'txt'}))
     
     def clean_query(self):
-        data = strip_accents(self.cleaned_data['query'])
-        
-        for country in COUNTRY.keys():
-            pattern = re.compile(re.escape(strip_accents(country)), re.IGNORECASE)
-            if pattern.search(data):
-                data = pattern.sub('', data, count=1)
-        data = ' '.join(data.split())
-        
+        _, data = country_matcher.match(self.cleaned_data['query'])
         return data
 
-def strip_accents(s):
-    return ''.join(c for c in unicodedata.normalize('NFD', s) if not unicodedata.combining(c))
+
+def get_facets(view):
+    """
+    Returns the facets for each of FACET_FILTERS, based on a search without
+    that filter. This is to allow users to change already selected filters.
+    
+    Searches that are still needed run concurrently and each distinct result
+    set is scanned only once. With a local index all facets come from the
+    index at once.
+    """
+    if view.index is not None:
+        querydict = view.querydict
+        return view.index.facets(FACET_FILTERS, query=querydict['query'], countries=querydict['countries'],
+                                 budget=querydict['budget'], sectors=querydict['sectors'])
+    if view.summary:
+        base_querydict = view.querydict
+    else:
+        base_querydict = dict(query=view.querydict['query'])
+    main_key = querydict_key(view.filter_querydict(view.querydict))
+    
+    searches = {}
+    keys = {}
+    for filter_name in FACET_FILTERS:
+        querydict = view.filter_querydict(base_querydict)
+        querydict.pop(filter_name, None)
+        key = keys[filter_name] = querydict_key(querydict)
+        if key not in searches and not (key == main_key and view.summary):
+            # the facets don't depend on the ordering
+            searches[key] = run_async(view.summarize, **querydict)
+    
+    facets = {main_key: scan_facets(view.summary or [])}
+    for key, result in searches.items():
+        facets[key] = scan_facets(result.get())
+    return dict((filter_name, facets[key]) for filter_name, key in keys.items())
+
+def querydict_key(querydict):
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in querydict.items()))
+
+def scan_facets(activities):
+    """
+    Collects the countries, sectors and largest budget of `activities` in one pass.
+    """
+    if isinstance(activities, (ActivityStore, SearchSummary)):
+        return activities.facets()
+    countries = set()
+    sectors = set()
+    largest_budget = 0
+    for project in activities:
+        if project['recipient_country_code']:
+            countries.add(project['recipient_country_code'])
+        if project['sector']:
+            sectors.add((project['sector_code'], project['sector']))
+        budget = Decimal(project['total_budget'])
+        if budget > largest_budget:
+            largest_budget = budget
+    return dict(countries=countries, sectors=sectors, largest_budget=largest_budget)
 
 
 class FilterRadioFieldRenderer(RadioFieldRenderer):
@@ -59,36 +109,20 @@ class FilterForm(forms.Form):
         super(FilterForm, self).__init__(*args, **kwargs)
         
         if view:
-            activities = view.queryset or view.search(query=view.querydict['query'])
+            facets = get_facets(view)
             
-            def get_qs_for(filter_name):
-                """
-                Does a search without the current filter.
-                This is to allow users to change already selected filters. 
-                """
-                if view.querydict.get(filter_name) and view.queryset:
-                    querydict = view.querydict.copy()
-                    del querydict[filter_name]
-                    return view.search(**querydict)
-                else:
-                    return activities
-        
-            qs = get_qs_for('countries')
-            countries = set(project['recipient_country_code'] for project in qs if project['recipient_country_code'])
+            countries = facets['countries']['countries']
             country_choices = sorted(zip(countries, [iso_to_country(iso) for iso in countries]), key=lambda country: country[1])
             country_choices = sorted(country_choices, key=lambda country: country[0] not in view.modified_request.getlist('countries'))
             
-            qs = get_qs_for('budget')
-            largest_budget = max(Decimal(project['total_budget']) for project in qs) if qs else 0
+            largest_budget = facets['budget']['largest_budget']
             budget_choices = list(itertools.takewhile(lambda x: x < largest_budget, [0, 10000, 50000, 100000, 500000, 1000000, 5000000, 10000000]))
-            budget_choices = zip(budget_choices, ['> ' + currency(budget) for budget in budget_choices])
+            budget_choices = zip(budget_choices, ['> ' + amount for amount in currency_column(budget_choices)])
             
-            qs = get_qs_for('sectors')
-            sector_choices = set((project['sector_code'], project['sector']) for project in qs if project['sector'])
-            sector_choices = sorted(sector_choices, key=lambda sector:sector[1])
+            sector_choices = sorted(facets['sectors']['sectors'], key=lambda sector:sector[1])
             sector_choices = sorted(sector_choices, key=lambda sector:sector[0] not in view.request.GET.getlist('sectors'))
             
-            region_choices = WorldBorder.objects.filter(iso2__in=countries).values_list('subregion', flat=True).distinct()
+            region_choices = country_registry.subregions_of(countries)
             region_choices = sorted(map(lambda x: (x, SUBREGIONS[x]), region_choices), key=lambda x: x[1])
             region_choices = sorted(region_choices, key=lambda region: unicode(region[0]) not in view.request.GET.getlist('regions'))
             
@@ -106,16 +140,13 @@ class FilterForm(forms.Form):
         # adds query countries to country list
         countries_from_query= []
         if query:
-            for country in COUNTRY.keys():
-                pattern = re.compile(re.escape(strip_accents(country)), re.IGNORECASE)
-                if pattern.search(query):
-                    countries_from_query.append(country_to_iso(country.lower()))
+            countries_from_query, _ = country_matcher.match(query)
         countries.extend(countries_from_query)
         
         # adds region countries to country list
         if regions:
             country_set = set(countries)
-            subregion_set = set(WorldBorder.objects.filter(subregion__in=regions).values_list('iso2', flat=True))
+            subregion_set = country_registry.countries_in(regions)
             countries = list(country_set.union(subregion_set))
             
         cleaned_data['countries_from_query'] = countries_from_query
@@ -0,0 +1,120 @@
+"""
+Throttled checks of the backend's last_updated value.
+
+The value is fetched at most once every `interval` seconds and shared by
+all threads of a process and, through the django cache, by all processes
+using the same cache. Once a check is overdue the known value keeps being
+served while a background thread fetches the new one, so requests never
+wait on the backend for it except for the very first one.
+"""
+import logging
+import random
+import threading
+import time
+from urlparse import urljoin
+
+from django.conf import settings
+from django.core.cache import cache
+
+from website.backend import client
+
+logger = logging.getLogger(__name__)
+
+
+class FreshnessToken(object):
+    cache_key = 'last_updated'
+    # fraction of the interval the poller's sleep varies by, so processes
+    # started together don't all check at the same moment
+    jitter = 0.2
+    # longest sleep of the poller after failed checks
+    max_backoff = 15 * 60
+
+    def __init__(self, fetch, interval=60):
+        self.fetch = fetch
+        self.interval = interval
+        self.token = None
+        self.checked = 0
+        self.lock = threading.Lock()
+        self.refreshing = False
+        self.poller = None
+
+    def get(self):
+        if self.token is not None and time.time() - self.checked < self.interval:
+            return self.token
+
+        # another process may have checked recently
+        shared = cache.get(self.cache_key)
+        if shared and time.time() - shared[1] < self.interval:
+            self.token, self.checked = shared
+            return self.token
+
+        if self.token is None:
+            # nothing to serve yet, so this one has to wait
+            return self.refresh()
+
+        # stale-while-revalidate
+        self.refresh_in_background()
+        return self.token
+
+    def refresh(self):
+        token = unicode(self.fetch())
+        with self.lock:
+            self.token, self.checked = token, time.time()
+        cache.set(self.cache_key, (self.token, self.checked), self.interval * 10)
+        return token
+
+    def refresh_in_background(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        thread = threading.Thread(target=self._background_refresh)
+        thread.daemon = True
+        thread.start()
+
+    def start_poller(self):
+        """
+        Keeps the token fresh from a background thread, so requests never
+        find it overdue.
+        """
+        if self.poller is None:
+            self.poller = threading.Thread(target=self._poll)
+            self.poller.daemon = True
+            self.poller.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception('Could not refresh last_updated')
+        finally:
+            self.refreshing = False
+
+    def poll_delay(self, failures=0):
+        """
+        Returns the seconds the poller sleeps: about `interval`, doubled for
+        each of the last `failures` checks that failed, up to `max_backoff`.
+        """
+        delay = min(self.interval * 2 ** failures, max(self.interval, self.max_backoff))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _poll(self):
+        failures = 0
+        while True:
+            try:
+                self.refresh()
+                failures = 0
+            except Exception:
+                failures += 1
+                logger.exception('Could not refresh last_updated')
+            time.sleep(self.poll_delay(failures))
+
+
+def fetch_last_updated():
+    return client.get(urljoin(settings.API_URL, 'last_updated/'))
+
+
+last_updated = FreshnessToken(fetch_last_updated, interval=getattr(settings, 'API_FRESHNESS_INTERVAL', 60))
+
+if getattr(settings, 'API_FRESHNESS_POLLER', False):
+    last_updated.start_poller()
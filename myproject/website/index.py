@@ -1,43 +1,309 @@
-from djapian import space,Indexer,CompositeIndexer
-
-from data.models import RecipientCountryBudget,Activity,Transaction
-
-#class RecipientCountryBudgetIndexer(Indexer):
-    #fields = ['country_name']
-    #tags = [
-        #('organisation','organisation'),
-        #('value','value'),
-        #]
-#space.add_index(RecipientCountryBudget,RecipientCountryBudgetIndexer,attach_as='indexer')
-
-class ActivityIndexer(Indexer):
-    fields = ['title','description','total_budget','organisation']
-    tags = [
-        ('identifier','identifier'),
-        ('organisation','organisation'),
-        ('title','title'),
-        ('description','description'),
-        ('sector','sector'),
-        ('sector_code','sector_code'),
-        ('pk','pk'),
-        ('total_budget','total_budget'),
-        ('cntr','recipient_country_code',3),
-        #('last_updated','last_updated'),
-        ]
-space.add_index(Activity,ActivityIndexer,attach_as='indexer')
-
-#class TransactionIndexer(Indexer):
-    #fields = ['activity.title']
-    #tags = [
-        #('transaction_type','transaction_type'),
-        #('provider_org','provider_org'),
-        #('reciver_org','reciver_org'),
-        #('value','value'),
-        #('value_date','value_date'),
-        #('transaction_date','transaction_date'),
-        #]
-#space.add_index(Transaction,TransactionIndexer,attach_as='indexer')    
-
-
-#complete_indexer = CompositeIndexer(RecipientCountryBudget.indexer,Activity.indexer,Transaction.indexer)
-complete_indexer = CompositeIndexer(Activity.indexer)
\ No newline at end of file
+"""
+Local search index over the activity mirror, see website.mirror.
+
+The index answers the searches and facets of WhereaidApi and FilterForm
+without going to the backend.
+"""
+import copy
+import re
+from array import array
+from bisect import bisect_right
+from decimal import Decimal
+
+from website.activitystore import ActivityStore
+from website.countries import country_registry, fold
+
+# the budget choices of the filter form
+BUDGET_BUCKETS = (0, 10000, 50000, 100000, 500000, 1000000, 5000000, 10000000)
+
+# `updated` compacts the columns once they hold more superseded rows than
+# this fraction of the current ones
+COMPACT_RATIO = 0.5
+
+# a keyword search stops narrowing its candidates by the words of the query
+# once there are this few of them, and checks the whole query on each
+MAX_CANDIDATES = 100
+
+_word = re.compile(r'\w+', re.UNICODE)
+
+def tokenize(text):
+    return _word.findall(fold(text or u''))
+
+
+class ActivityIndex(object):
+    """
+    An inverted index of the words in the titles and descriptions of an
+    ActivityStore, plus row lists per country and sector.
+
+    A keyword search finds the rows with words containing each word of
+    the query, then keeps those whose title or description contains the
+    whole query, like the backend's icontains search. Case and accents are
+    ignored.
+    """
+    def __init__(self, store, registry=country_registry):
+        self.registry = registry
+        # the backend's last_updated value of the data, set by the mirror
+        self.token = None
+        columns = store.columns
+        self.rows = array('l', store.indexes())
+        # rows appended to the columns by `updated` are not part of this index
+        self.store = ActivityStore(columns, self.rows)
+        self.size = len(self.rows)
+        self.row_of = dict((columns.ids[i], i) for i in self.rows)
+
+        postings = {}
+        for i in self.rows:
+            for token in self._tokens(i):
+                postings.setdefault(token, []).append(i)
+        self.postings = dict((token, array('l', rows)) for token, rows in postings.iteritems())
+        self.vocabulary = sorted(self.postings)
+
+        self.by_country = {}
+        self.by_sector = {}
+        for i in self.rows:
+            self.by_country.setdefault(self._country(i), []).append(i)
+            self.by_sector.setdefault(self._sector(i), []).append(i)
+
+        # rows by budget, for the budget filter and ordering
+        self.by_budget = array('l', sorted(self.rows, key=columns.budget_cents.__getitem__))
+        self.sorted_cents = [columns.budget_cents[i] for i in self.by_budget]
+
+    def _tokens(self, i):
+        columns = self.store.columns
+        return set(tokenize(columns.titles[i]) + tokenize(columns.descriptions[i]))
+
+    def _country(self, i):
+        columns = self.store.columns
+        return columns.countries.values[columns.country_refs[i]]
+
+    def _sector(self, i):
+        columns = self.store.columns
+        return columns.sectors.values[columns.sector_refs[i]][0]
+
+    def updated(self, activities):
+        """
+        Returns a new index with `activities` added, replacing the ones with
+        the same id.
+
+        The new rows are appended to the shared columns, and only the
+        postings, country, sector and budget entries of the changed rows are
+        rebuilt. Searches on this index are not affected. The rows replaced
+        stay in the columns until there are enough of them for the new
+        index to be built on compacted columns instead.
+        """
+        columns = self.store.columns
+        index = copy.copy(self)
+        index.row_of = dict(self.row_of)
+        old_rows, new_rows = set(), []
+        for activity in activities:
+            old = index.row_of.get(int(activity['id']))
+            if old is not None:
+                old_rows.add(old)
+            i = len(columns.ids)
+            columns.append(activity)
+            index.row_of[columns.ids[i]] = i
+            new_rows.append(i)
+        # an activity may appear twice in a batch, the last one wins
+        old_rows.update(i for i in new_rows if index.row_of[columns.ids[i]] != i)
+        new_rows = [row for row in new_rows if row not in old_rows]
+
+        index.rows = array('l', sorted(set(self.rows).difference(old_rows).union(new_rows)))
+        index.size = len(index.rows)
+        index.store = ActivityStore(columns, index.rows)
+        index.postings = self._patched(self.postings, old_rows, new_rows, self._tokens)
+        if index.postings.viewkeys() != self.postings.viewkeys():
+            index.vocabulary = sorted(index.postings)
+        index.by_country = self._patched(self.by_country, old_rows, new_rows, lambda i: [self._country(i)])
+        index.by_sector = self._patched(self.by_sector, old_rows, new_rows, lambda i: [self._sector(i)])
+
+        cents = columns.budget_cents
+        by_budget = [i for i in self.by_budget if i not in old_rows]
+        sorted_cents = [cents[i] for i in by_budget]
+        for i in new_rows:
+            position = bisect_right(sorted_cents, cents[i])
+            by_budget.insert(position, i)
+            sorted_cents.insert(position, cents[i])
+        index.by_budget = array('l', by_budget)
+        index.sorted_cents = sorted_cents
+        if len(columns.ids) - index.size > COMPACT_RATIO * index.size:
+            return index.compacted()
+        return index
+
+    def compacted(self):
+        """
+        Returns a new index over new columns holding only the rows of this
+        one, without the rows replaced by `updated`.
+        """
+        index = ActivityIndex(ActivityStore.from_dicts(self.store), self.registry)
+        index.token = self.token
+        return index
+
+    def _patched(self, entries, old_rows, new_rows, keys_of):
+        """
+        Returns a copy of the row lists in `entries` without `old_rows` and
+        with `new_rows` added under their keys.
+        """
+        affected = {}
+        for i in old_rows:
+            for key in keys_of(i):
+                affected.setdefault(key, [])
+        for i in new_rows:
+            for key in keys_of(i):
+                affected.setdefault(key, []).append(i)
+        entries = dict(entries)
+        for key, added in affected.items():
+            rows = [i for i in entries.get(key, ()) if i not in old_rows] + added
+            if rows:
+                entries[key] = array('l', rows)
+            else:
+                entries.pop(key, None)
+        return entries
+
+    def match_keywords(self, query):
+        """
+        Returns the set of rows matching `query`, None if it is empty.
+        """
+        phrase = fold(query or u'').strip()
+        if not phrase:
+            return None
+        columns = self.store.columns
+        candidates = None
+        # the longest words have the fewest matches
+        for word in sorted(set(tokenize(phrase)), key=len, reverse=True):
+            if candidates is not None and len(candidates) <= MAX_CANDIDATES:
+                break
+            rows = set()
+            for token in self._tokens_containing(word):
+                rows.update(self.postings[token])
+            candidates = rows if candidates is None else candidates & rows
+            if not candidates:
+                return set()
+        if candidates is None:
+            candidates = self.rows
+        return set(
+            i for i in candidates
+            if phrase in fold(columns.titles[i] or u'') or phrase in fold(columns.descriptions[i] or u'')
+        )
+
+    def _tokens_containing(self, word):
+        """
+        Returns the words of the index `word` is part of, "water" is part
+        of "drinkwatervoorziening" too.
+        """
+        # a scan of the vocabulary, it is much smaller than the rows
+        return [token for token in self.vocabulary if word in token]
+
+    def filter_sets(self, query='', countries=(), budget=None, sectors=()):
+        """
+        Returns the rows matching each given filter, by filter name.
+        """
+        sets = {}
+        keywords = self.match_keywords(query)
+        if keywords is not None:
+            sets['query'] = keywords
+        if countries:
+            sets['countries'] = set(i for iso in countries for i in self.by_country.get(iso, ()))
+        if sectors:
+            sets['sectors'] = set(i for code in sectors for i in self.by_sector.get(code, ()))
+        if budget not in ('', None, []):
+            cents = int(Decimal(budget).scaleb(2))
+            sets['budget'] = set(self.by_budget[bisect_right(self.sorted_cents, cents):])
+        return sets
+
+    def _intersect(self, sets, exclude=None):
+        result = None
+        for name, rows in sorted(sets.items(), key=lambda item: len(item[1])):
+            if name != exclude:
+                result = rows if result is None else result & rows
+        return result
+
+    def search(self, order_by=None, offset=None, limit=None, **filters):
+        """
+        Returns the matching activities as an ActivityStore, in the order of
+        `order_by` and sliced with `offset` and `limit`.
+        """
+        rows = self._intersect(self.filter_sets(**filters))
+        columns = self.store.columns
+        field = (order_by or '').lstrip('-')
+        reverse = (order_by or '').startswith('-')
+        if field == 'total_budget':
+            order = self.by_budget if rows is None else sorted(rows, key=columns.budget_cents.__getitem__)
+        elif field == 'start_actual':
+            dates = columns.start_dates.values
+            order = sorted(rows if rows is not None else self.rows,
+                           key=lambda i: dates[columns.start_date_refs[i]])
+        elif field == 'recipient_country':
+            names = [self.registry.to_name(iso) for iso in columns.countries.values]
+            order = sorted(rows if rows is not None else self.rows,
+                           key=lambda i: names[columns.country_refs[i]])
+        else:
+            order = sorted(rows) if rows is not None else self.rows
+        order = array('l', order)
+        if reverse:
+            order.reverse()
+        if offset is not None or limit is not None:
+            start = offset or 0
+            order = order[start:start + limit if limit is not None else None]
+        return ActivityStore(columns, order)
+
+    def facets(self, facet_filters, **filters):
+        """
+        Returns for each of `facet_filters` the facets of the activities
+        matching all the other filters, from one set of filter lookups.
+
+        Without any matching activity, the facets of the keyword search
+        alone are returned for all filters.
+        """
+        sets = self.filter_sets(**filters)
+        matching = self._intersect(sets)
+        if matching is not None and not matching:
+            sets = dict((name, rows) for name, rows in sets.items() if name == 'query')
+        scanned = {}
+        facets = {}
+        for filter_name in facet_filters:
+            rows = self._intersect(sets, exclude=filter_name)
+            key = frozenset(name for name in sets if name != filter_name)
+            if key not in scanned:
+                scanned[key] = self.count(rows)
+            facets[filter_name] = scanned[key]
+        return facets
+
+    def count(self, rows=None):
+        """
+        Returns the countries, sectors and largest budget of `rows`, with the
+        number of activities per country, subregion, sector and budget bucket.
+        """
+        columns = self.store.columns
+        country_counts = {}
+        sector_counts = {}
+        largest = 0
+        for i in (rows if rows is not None else self.rows):
+            country = columns.country_refs[i]
+            country_counts[country] = country_counts.get(country, 0) + 1
+            sector = columns.sector_refs[i]
+            sector_counts[sector] = sector_counts.get(sector, 0) + 1
+            if columns.budget_cents[i] > largest:
+                largest = columns.budget_cents[i]
+
+        countries = dict((columns.countries.values[ref], n) for ref, n in country_counts.items())
+        countries.pop(None, None)
+        countries.pop(u'', None)
+        sectors = dict((columns.sectors.values[ref], n) for ref, n in sector_counts.items() if columns.sectors.values[ref][1])
+        regions = {}
+        for iso, n in countries.items():
+            for subregion in self.registry.subregions_of([iso]):
+                regions[subregion] = regions.get(subregion, 0) + n
+        sorted_cents = self.sorted_cents if rows is None else sorted(columns.budget_cents[i] for i in rows)
+        budgets = dict(
+            (threshold, len(sorted_cents) - bisect_right(sorted_cents, threshold * 100))
+            for threshold in BUDGET_BUCKETS
+        )
+        return dict(
+            countries=set(countries),
+            sectors=set(sectors),
+            largest_budget=Decimal(largest).scaleb(-2),
+            country_counts=countries,
+            sector_counts=sectors,
+            region_counts=regions,
+            budget_counts=budgets,
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from website.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    args = '[name ...]'
+    help = 'Runs the named micro-benchmarks, or all of them. Available: %s' % ', '.join(sorted(BENCHMARKS))
+
+    def handle(self, *names, **options):
+        for name in names or sorted(BENCHMARKS):
+            if name not in BENCHMARKS:
+                raise CommandError('Unknown benchmark: %s' % name)
+            self.stdout.write('%s\n' % name)
+            for result in BENCHMARKS[name]():
+                # results are in microseconds unless they name a unit
+                label, value, unit = (result + ('us',))[:3]
+                self.stdout.write('  %-30s %10.1f %s\n' % (label, value, unit))
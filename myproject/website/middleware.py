@@ -0,0 +1,12 @@
+from django.middleware.gzip import GZipMiddleware as BaseGZipMiddleware
+
+
+class GZipMiddleware(BaseGZipMiddleware):
+    """
+    Leaves responses marked as streaming alone; compressing them would read
+    the whole response into memory.
+    """
+    def process_response(self, request, response):
+        if getattr(response, 'streaming', False):
+            return response
+        return super(GZipMiddleware, self).process_response(request, response)
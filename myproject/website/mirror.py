@@ -0,0 +1,217 @@
+"""
+A local mirror of the backend's activities, transactions and policy
+markers, kept in sync with the backend's last_updated value.
+
+The first load fetches everything. After that only what changed since the
+last synced value is fetched, with the backend's last_updated__gt filter,
+and applied to the search index incrementally. A backend that fails the
+filtered requests gets everything fetched again instead. Activities removed
+from the backend stay in the mirror until the process restarts.
+
+Transactions and policy markers are grouped by their activity_id field.
+"""
+import logging
+import threading
+import time
+from collections import deque, OrderedDict
+from urllib import urlencode
+from urlparse import urljoin
+
+from django.conf import settings
+
+from website.activitystore import ActivityStore, FIELDS
+from website.backend import client, BackendError
+from website.index import ActivityIndex
+from website.utils import iter_json_array
+from website import freshness
+
+logger = logging.getLogger(__name__)
+
+
+def merged(grouped, changes, keep=None, key=None):
+    """
+    Returns a copy of `grouped`, lists of items by activity id, with the
+    changed items replacing the ones with the same id. Only items passing
+    `keep` are kept, ordered by `key` if given.
+    """
+    grouped = dict(grouped)
+    changed = {}
+    for item in changes:
+        changed.setdefault(item['activity_id'], []).append(item)
+    for activity_id, items in changed.items():
+        by_id = OrderedDict((item['id'], item) for item in grouped.get(activity_id, ()))
+        for item in items:
+            by_id[item['id']] = item
+        items = [item for item in by_id.values() if keep is None or keep(item)]
+        if key is not None:
+            items.sort(key=key)
+        grouped[activity_id] = items
+    return grouped
+
+def is_significant(policy_marker):
+    # the project pages only show the markers with a significance
+    return int(policy_marker['significance'] or 0) > 0
+
+
+class ActivityMirror(object):
+    """
+    Holds the ActivityIndex over all activities plus the transactions and
+    policy markers per activity id, for the last synced last_updated value.
+
+    Each load or sync builds new objects and swaps them in, so requests
+    never see a half applied batch. The timings of the last `history`
+    batches are kept for `stats`.
+    """
+    def __init__(self, fetch, interval=60, history=20):
+        self.fetch = fetch
+        self.interval = interval
+        self.index = None
+        self.transactions = {}
+        self.policy_markers = {}
+        self.token = None
+        self.synced = None
+        # when the backend was first seen ahead of the mirror
+        self.behind_since = None
+        self.batches = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.syncing = False
+        self.worker = None
+
+    def get(self, token):
+        """
+        Returns the index. The first call loads the mirror; if `token` is
+        newer than the mirror, it is synced in the background and the
+        current index is returned meanwhile.
+        """
+        if self.index is None:
+            self.update(token)
+        elif token != self.token:
+            if self.behind_since is None:
+                self.behind_since = time.time()
+            self.sync_in_background(token)
+        return self.index
+
+    def update(self, token):
+        """
+        Loads the mirror or syncs it up to `token`.
+        """
+        with self.lock:
+            if self.index is not None and token == self.token:
+                return
+            if self.behind_since is None:
+                self.behind_since = time.time()
+            started = time.time()
+            full = self.index is None
+            if not full:
+                try:
+                    activities, transactions, policy_markers = self._fetch_all(last_updated__gt=self.token)
+                except BackendError, e:
+                    logger.warning('Reloading the activity mirror, the changes since %s could not be fetched: %s',
+                                   self.token, e)
+                    full = True
+            if full:
+                activities, transactions, policy_markers = self._fetch_all()
+            fetched = time.time()
+            counts = dict(activities=len(activities), transactions=len(transactions),
+                          policy_markers=len(policy_markers))
+
+            if full:
+                index = ActivityIndex(ActivityStore.from_dicts(activities))
+                grouped_transactions, grouped_policy_markers = {}, {}
+            else:
+                index = self.index.updated(activities)
+                grouped_transactions, grouped_policy_markers = self.transactions, self.policy_markers
+            index.token = token
+            transactions = merged(grouped_transactions, transactions)
+            policy_markers = merged(grouped_policy_markers, policy_markers,
+                                    keep=is_significant, key=lambda marker: marker['code'])
+            self.index, self.transactions, self.policy_markers = index, transactions, policy_markers
+            self.token = token
+            self.synced = time.time()
+
+            counts.update(
+                token=token,
+                full=full,
+                fetch_seconds=fetched - started,
+                apply_seconds=self.synced - fetched,
+                lag_seconds=self.synced - self.behind_since,
+            )
+            self.behind_since = None
+            self.batches.append(counts)
+            logger.info('%s the activity mirror to %s: %s activities, %s transactions, %s policy markers; '
+                        'fetch %.2fs, apply %.2fs, lag %.2fs', 'Loaded' if full else 'Synced', token,
+                        counts['activities'], counts['transactions'], counts['policy_markers'],
+                        counts['fetch_seconds'], counts['apply_seconds'], counts['lag_seconds'])
+
+    def _fetch_all(self, **query):
+        return (self.fetch('activity', **query), self.fetch('transaction', **query),
+                self.fetch('policymarker', **query))
+
+    def sync_in_background(self, token):
+        with self.lock:
+            if self.syncing:
+                return
+            self.syncing = True
+        thread = threading.Thread(target=self._background_sync, args=(token,))
+        thread.daemon = True
+        thread.start()
+
+    def start_worker(self):
+        """
+        Syncs the mirror from a background thread every `interval` seconds,
+        so requests find it up to date.
+        """
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._work)
+            self.worker.daemon = True
+            self.worker.start()
+
+    def lag(self):
+        """
+        Returns the seconds since the backend was first seen ahead of the mirror.
+        """
+        if self.behind_since is None:
+            return 0
+        return time.time() - self.behind_since
+
+    def stats(self):
+        return dict(
+            token=self.token,
+            synced=self.synced,
+            lag=self.lag(),
+            activities=self.index.size if self.index is not None else 0,
+            batches=list(self.batches),
+        )
+
+    def _background_sync(self, token):
+        try:
+            self.update(token)
+        except Exception:
+            logger.exception('Could not sync the activity mirror')
+        finally:
+            self.syncing = False
+
+    def _work(self):
+        while True:
+            try:
+                self.update(freshness.last_updated.get())
+            except Exception:
+                logger.exception('Could not sync the activity mirror')
+            time.sleep(self.interval)
+
+
+def backend_fetcher(api_url):
+    def fetch(handler, **query):
+        url = urljoin(api_url, handler)
+        if query:
+            url += '?' + urlencode(sorted(query.items()))
+        # of the activities only the fields the index uses are kept
+        fields = FIELDS if handler == 'activity' else None
+        return list(iter_json_array(client.stream(url), fields=fields))
+    return fetch
+
+
+activity_mirror = ActivityMirror(backend_fetcher(settings.API_URL), interval=getattr(settings, 'API_FRESHNESS_INTERVAL', 60))
+
+if getattr(settings, 'MIRROR_SYNC_WORKER', False):
+    activity_mirror.start_worker()
@@ -0,0 +1,163 @@
+"""
+In-process cache of rendered pages for anonymous visitors.
+
+Pages are keyed on the view, its sorted query parameters and the backend's
+last_updated value, and stored with both the plain and the gzipped body,
+so a hit is served without searching, rendering or compressing. Pages
+missing data, or made from data older than last_updated, are not stored.
+Entries are evicted least recently used first once their bodies take more
+than `max_bytes`, and all of them are dropped when last_updated changes.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from website.conditional import canonical_query
+
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+# GZipMiddleware leaves shorter responses alone
+MIN_COMPRESS_SIZE = 200
+
+
+class CachedPage(object):
+    __slots__ = ('headers', 'body', 'gzipped')
+
+    def __init__(self, response):
+        self.headers = [(name, value) for name, value in response.items()
+                        if name.lower() not in ('content-length', 'content-encoding')]
+        self.body = response.content
+        self.gzipped = None
+        if len(self.body) >= MIN_COMPRESS_SIZE:
+            gzipped = compress_string(self.body)
+            if len(gzipped) < len(self.body):
+                self.gzipped = gzipped
+
+    @property
+    def size(self):
+        return len(self.body) + len(self.gzipped or '')
+
+    def response(self, gzip=False):
+        body = self.gzipped if gzip and self.gzipped is not None else self.body
+        response = HttpResponse(body)
+        for name, value in self.headers:
+            response[name] = value
+        if body is self.gzipped:
+            # GZipMiddleware leaves responses with a Content-Encoding alone
+            response['Content-Encoding'] = 'gzip'
+        response['Content-Length'] = str(len(body))
+        if self.gzipped is not None:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class PageCache(object):
+    def __init__(self, max_bytes=32*1024*1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.token = None
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def validate(self, token):
+        """
+        Drops all pages if `token` differs from the one they were stored with.
+        """
+        with self.lock:
+            if token != self.token:
+                self.entries.clear()
+                self.size = 0
+                self.token = token
+
+    def get(self, key):
+        with self.lock:
+            page = self.entries.pop(key, None)
+            if page is None:
+                self.misses += 1
+                return None
+            # re-insert to mark as most recently used
+            self.entries[key] = page
+            self.hits += 1
+            return page
+
+    def set(self, key, page):
+        if page.size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+            self.entries[key] = page
+            self.size += page.size
+            while self.size > self.max_bytes:
+                evicted = self.entries.popitem(last=False)[1]
+                self.size -= evicted.size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.token = None
+
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def stats(self):
+        return dict(
+            token=self.token,
+            pages=len(self.entries),
+            bytes=self.size,
+            max_bytes=self.max_bytes,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            hit_ratio=self.hit_ratio(),
+        )
+
+
+def is_cacheable(request):
+    user = getattr(request, 'user', None)
+    return request.method == 'GET' and (user is None or not user.is_authenticated())
+
+def is_cacheable_response(response):
+    return (response.status_code == 200 and not getattr(response, 'streaming', False)
+            and not response.cookies)
+
+
+class PageCacheMixin(object):
+    """
+    Serves anonymous GET requests from `page_cache`.
+
+    The view must have the `last_updated` and `is_current` methods of
+    ApiMixin.
+    """
+    page_cache = None
+
+    def dispatch(self, request, *args, **kwargs):
+        page_cache = self.page_cache
+        if page_cache is None or not page_cache.max_bytes or not is_cacheable(request):
+            return super(PageCacheMixin, self).dispatch(request, *args, **kwargs)
+        page_cache.validate(self.last_updated())
+        key = (self.__class__.__name__, canonical_query(request.GET), tuple(sorted(kwargs.items())))
+        page = page_cache.get(key)
+        if page is None:
+            response = super(PageCacheMixin, self).dispatch(request, *args, **kwargs)
+            if not is_cacheable_response(response) or not self.is_current():
+                return response
+            if hasattr(response, 'render'):
+                # a TemplateResponse is rendered here instead of by the handler
+                response.render()
+            page = CachedPage(response)
+            page_cache.set(key, page)
+        return page.response(gzip=bool(_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))))
+
+
+page_cache = PageCache(max_bytes=getattr(settings, 'PAGE_CACHE_MAX_BYTES', 32*1024*1024))
@@ -0,0 +1,231 @@
+"""
+A cache backend shared by all processes on a host, stored in files.
+
+Entries are written to a temporary file and renamed into place, so readers
+see either the old or the new entry, never half of one. Large entries are
+compressed. `get_or_fill` takes a per-key file lock so that only one
+process fills a missing entry while the others wait for it.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'website.sharedcache.SharedFileCache',
+            'LOCATION': '/var/tmp/openaid-cache',
+            'OPTIONS': {'COMPRESS_MIN_SIZE': 64 * 1024},
+        }
+    }
+"""
+import cPickle as pickle
+import errno
+import fcntl
+import os
+import tempfile
+import time
+import zlib
+
+from django.core.cache.backends.base import BaseCache
+from django.utils.hashcompat import md5_constructor
+
+# first byte of an entry file
+PLAIN, COMPRESSED = 'p', 'z'
+
+
+class SharedFileCache(BaseCache):
+    def __init__(self, dir, params):
+        BaseCache.__init__(self, params)
+        options = params.get('OPTIONS', {})
+        self.dir = dir
+        self.compress_min_size = options.get('COMPRESS_MIN_SIZE', 64 * 1024)
+        # seconds to wait on another process filling an entry
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 60)
+        if not os.path.isdir(dir):
+            try:
+                os.makedirs(dir)
+            except OSError, e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+    def add(self, key, value, timeout=None, version=None):
+        if self.has_key(key, version=version):
+            return False
+        self.set(key, value, timeout, version=version)
+        return True
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        value = self._read(self._path(key))
+        if value is None:
+            return default
+        return value[0]
+
+    def set(self, key, value, timeout=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._write(self._path(key), value, timeout)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._remove(self._path(key))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._read(self._path(key)) is not None
+
+    def clear(self):
+        for name in os.listdir(self.dir):
+            if name.endswith('.cache'):
+                self._remove(os.path.join(self.dir, name))
+
+    def get_or_fill(self, key, fill, timeout=None, version=None):
+        """
+        Returns the value of `key`, storing the result of `fill()` if it is
+        missing. Of all processes missing the key at once only one calls
+        `fill`; the others wait for its result.
+        """
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        path = self._path(key)
+        value = self._read(path)
+        if value is not None:
+            return value[0]
+
+        lock = self._acquire(path[:-len('.cache')] + '.lock')
+        try:
+            # filled while we waited for the lock
+            value = self._read(path)
+            if value is not None:
+                return value[0]
+            value = fill()
+            self._write(path, value, timeout)
+            return value
+        finally:
+            lock.close()
+
+    def _path(self, key):
+        return os.path.join(self.dir, md5_constructor(key).hexdigest() + '.cache')
+
+    def _acquire(self, lock_path):
+        """
+        Returns the lock file at `lock_path`, open and locked unless the wait
+        for it timed out.
+        """
+        while True:
+            f = open(lock_path, 'a')
+            if not self._lock(f):
+                return f
+            # `_cull` removes unused lock files; one removed while we waited
+            # for it doesn't keep the others out, take the new one instead
+            try:
+                current = os.fstat(f.fileno()).st_ino == os.stat(lock_path).st_ino
+            except OSError:
+                current = False
+            if current:
+                # `_cull` leaves lock files used recently alone
+                os.utime(lock_path, None)
+                return f
+            f.close()
+
+    def _lock(self, f):
+        """
+        Returns whether `f` was locked before the wait for it timed out.
+        """
+        # a filler that hangs or died holding the lock is not waited on forever
+        deadline = time.time() + self.lock_timeout
+        while True:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except IOError, e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES) or time.time() > deadline:
+                    return False
+            time.sleep(0.05)
+
+    def _read(self, path):
+        """
+        Returns (value,), or None if the entry is missing or expired.
+        """
+        try:
+            f = open(path, 'rb')
+        except IOError:
+            return None
+        try:
+            header = f.readline()
+            data = f.read()
+        finally:
+            f.close()
+        try:
+            kind, expires = header[0], float(header[1:])
+        except (IndexError, ValueError):
+            return None
+        if expires < time.time():
+            self._remove(path)
+            return None
+        if kind == COMPRESSED:
+            data = zlib.decompress(data)
+        return (pickle.loads(data),)
+
+    def _write(self, path, value, timeout):
+        if timeout is None:
+            timeout = self.default_timeout
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        kind = PLAIN
+        if len(data) >= self.compress_min_size:
+            data, kind = zlib.compress(data, 1), COMPRESSED
+        self._cull()
+        fd, temporary_path = tempfile.mkstemp(dir=self.dir, suffix='.tmp')
+        f = os.fdopen(fd, 'wb')
+        try:
+            f.write('%s%r\n' % (kind, time.time() + timeout))
+            f.write(data)
+            f.close()
+            os.rename(temporary_path, path)
+        finally:
+            if not f.closed:
+                f.close()
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _cull(self):
+        names = os.listdir(self.dir)
+        # lock files of keys nobody filled for a while
+        oldest = time.time() - self.lock_timeout * 10
+        for name in names:
+            if name.endswith('.lock') and self._mtime(os.path.join(self.dir, name)) < oldest:
+                self._remove_lock(os.path.join(self.dir, name))
+        names = [name for name in names if name.endswith('.cache')]
+        if len(names) < self._max_entries:
+            return
+        paths = [os.path.join(self.dir, name) for name in names]
+        paths.sort(key=self._mtime)
+        for path in paths[:len(paths) / self._cull_frequency or 1]:
+            self._remove(path)
+
+    def _remove_lock(self, path):
+        """
+        Removes the lock file at `path` unless a process holds it.
+        """
+        try:
+            fd = os.open(path, os.O_WRONLY)
+        except OSError:
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self._remove(path)
+        except IOError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _mtime(self, path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0
@@ -1,16 +1,13 @@
-import string
-
 from django import template
 
-from website.iso_country_code import COUNTRY_REVERSED, COUNTRY
+from website.countries import country_registry
 
 register = template.Library()
 
 @register.filter
 def country_to_iso(value):
-    countries = dict(zip(map(string.lower,COUNTRY.keys()),COUNTRY.values()))
-    return countries.get(value.lower(), "Unknown")
+    return country_registry.to_iso(value, "Unknown")
 
 @register.filter
 def iso_to_country(value):
-    return COUNTRY_REVERSED.get(value, "")
+    return country_registry.to_name(value)
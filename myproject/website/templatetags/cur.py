@@ -1,27 +1,82 @@
+import re
+
 from django import template
 from django.conf import settings
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 register = template.Library()
 
-@register.filter
-def currency(value):
-    symbol = '$' 
-    thousand_sep = ''
-    decimal_sep = ''
-    # try to use settings if set 
-    try:
-        symbol = settings.CURRENCY_SYMBOL
-    except AttributeError:
-        pass
+# plain decimal notation, as the backend sends amounts
+_plain_number = re.compile(r'^\s*([-+]?)(\d*)(?:\.(\d*))?\s*$')
+
+
+class CurrencyFormatter(object):
+    """
+    Formats amounts as "<symbol><amount>" with grouped thousands.
+
+    Amounts are rounded half up to `places` decimals. Amounts in plain
+    decimal notation are rounded on their digits, without going through
+    Decimal arithmetic.
+    """
+    def __init__(self, symbol='$', thousand_sep=',', decimal_sep='.'):
+        self.prefix = unicode(symbol)
+        self.thousand_sep = unicode(thousand_sep)
+        self.decimal_sep = unicode(decimal_sep)
+
+    def format(self, value, places=0):
+        if isinstance(value, (int, long)):
+            negative, units = value < 0, abs(value) * 10 ** places
+        else:
+            negative, units = self._to_units(value, places)
+        intpart, fraction = divmod(units, 10 ** places)
+        intpart = format(intpart, ',')
+        if self.thousand_sep != u',':
+            intpart = intpart.replace(',', self.thousand_sep)
+        if places:
+            intpart = u'%s%s%0*d' % (intpart, self.decimal_sep, places, fraction)
+        return u'%s%s%s' % (self.prefix, u'-' if negative and units else u'', intpart)
 
+    def format_column(self, values, places=0):
+        """
+        Formats a whole column of amounts.
+        """
+        format = self.format
+        return [format(value, places) for value in values]
+
+    def _to_units(self, value, places):
+        """
+        Returns whether `value` is negative and its absolute value in units
+        of 10 ** -places, rounded half up.
+        """
+        match = _plain_number.match(unicode(value))
+        if match and (match.group(2) or match.group(3)):
+            sign, intpart, fraction = match.groups()
+            fraction = (fraction or '').ljust(places + 1, '0')
+            units = int((intpart or '0') + fraction[:places])
+            if fraction[places] >= '5':
+                units += 1
+            return sign == '-', units
+        # exponents, floats and the like
+        value = Decimal(value).scaleb(places).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        return value < 0, abs(int(value))
+
+
+def _formatter_from_settings():
+    # try to use settings if set
+    symbol = getattr(settings, 'CURRENCY_SYMBOL', '$')
     try:
         thousand_sep = settings.THOUSAND_SEPARATOR
         decimal_sep = settings.DECIMAL_SEPARATOR
     except AttributeError:
-        thousand_sep = ',' 
-        decimal_sep = '.' 
+        thousand_sep = ','
+        decimal_sep = '.'
+    return CurrencyFormatter(symbol, thousand_sep, decimal_sep)
+
+formatter = _formatter_from_settings()
+
+
+@register.filter
+def currency(value, places=0):
+    return formatter.format(value, int(places))
 
-    intstr = str(int(Decimal(value)))
-    f = lambda x, n, acc=[]: f(x[:-n], n, [(x[-n:])]+acc) if x else acc
-    intpart = thousand_sep.join(f(intstr, 3))
-    return "%s%s" % (symbol, intpart)
+def currency_column(values, places=0):
+    return formatter.format_column(values, places)
@@ -4,8 +4,41 @@ when you run "manage.py test".
 
 Replace this with more appropriate tests for your application.
 """
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from cStringIO import StringIO
+from decimal import Decimal
 
 from django.test import TestCase
+from django.core.paginator import Paginator
+from django.test.client import RequestFactory
+from django.http import Http404
+from django.utils import simplejson
+from django.core.cache import cache
+from django.conf import settings
+
+from website.backend import HttpClient, BackendError, client, run_async
+from website.apicache import ResponseCache, SingleFlight, response_cache
+from website.freshness import FreshnessToken
+from website.countries import country_matcher, country_registry, CountryRegistry
+from website.iso_country_code import COUNTRY, COUNTRY_REVERSED
+from website.index import ActivityIndex
+from website.mirror import ActivityMirror, backend_fetcher
+from website.sharedcache import SharedFileCache
+from world.snapshot import BorderSnapshot, borders
+from website.utils import UnicodeCSVStream, iter_json_array
+from website.export import parse_range, tee
+from website.templatetags.cur import CurrencyFormatter
+from website.activitystore import ActivityStore, SearchSummary
+from website.views import BaseProjectDetailApi, ProjectDetailApi, WhereaidApi, BackendActivityList
+from website.conditional import token_time
+from website.pagecache import PageCache
 
 
 class SimpleTest(TestCase):
@@ -14,3 +47,890 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class StubBackendHandler(BaseHTTPRequestHandler):
+    """
+    Serves `server.responses[path]` as the body of a keep-alive response,
+    after calling `server.before[path]`, if any, with the path without
+    its query. The query parameters of `path` are in sorted order.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        path, _, query = self.path.partition('?')
+        before = self.server.before.get(path)
+        if before is not None:
+            before()
+        if query:
+            path += '?' + '&'.join(sorted(param for param in query.split('&') if param))
+        if path not in self.server.responses:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = self.server.responses[path]
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            buf = StringIO()
+            f = gzip.GzipFile(fileobj=buf, mode='wb')
+            f.write(body)
+            f.close()
+            body = buf.getvalue()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubBackend(object):
+    def __init__(self, responses):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubBackendHandler)
+        self.server.responses = responses
+        self.server.requests = []
+        self.server.before = {}
+        self.url = 'http://127.0.0.1:%s/' % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class HttpClientTest(TestCase):
+    def setUp(self):
+        self.backend = StubBackend({
+            '/activity/': '[{"title": "test"}]',
+            '/last_updated/': '2012-02-13',
+        })
+        self.client = HttpClient(maxsize=2, connect_timeout=1, read_timeout=1)
+
+    def tearDown(self):
+        self.client.close()
+        self.backend.stop()
+
+    def test_get_decompresses_gzip(self):
+        self.assertEqual(self.client.get(self.backend.url + 'activity/'), '[{"title": "test"}]')
+
+    def test_connections_are_reused(self):
+        for i in range(5):
+            self.client.get(self.backend.url + 'last_updated/')
+        pool = self.client.pools.values()[0]
+        self.assertEqual(pool.connections_made, 1)
+        self.assertEqual(len(self.backend.server.requests), 5)
+
+    def test_stream(self):
+        chunks = self.client.stream(self.backend.url + 'activity/', chunk_size=4)
+        self.assertEqual(''.join(chunks), '[{"title": "test"}]')
+        self.client.get(self.backend.url + 'last_updated/')
+        self.assertEqual(self.client.pools.values()[0].connections_made, 1)
+        self.assertRaises(BackendError, self.client.stream, self.backend.url + 'missing/')
+
+    def test_error_status_raises(self):
+        self.assertRaises(BackendError, self.client.get, self.backend.url + 'missing/')
+
+    def test_unreachable_host_raises(self):
+        self.backend.stop()
+        self.assertRaises(BackendError, self.client.get, self.backend.url + 'activity/')
+
+
+PROJECT = dict(
+    id=12, organisation_id=3, title=u'Schools', identifier=u'NL-1-12', recipient_country_code=u'ML',
+    sector=u'Basic education', sector_code=u'11220', last_updated=u'2012-02-13', total_budget=u'1000.00',
+    start_planned=u'2010-01-01', start_actual=None, end_planned=None, end_actual=None,
+    collaboration_type=None, default_flow_type=None, default_aid_type=None, default_finance_type=None,
+    default_tied_status=None, activity_status=None,
+)
+
+
+class ProjectDetailTest(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.backend = StubBackend({
+            '/activity/12/': simplejson.dumps(PROJECT),
+            '/organisation/3/': simplejson.dumps({'name': 'BuZa', 'type': 'Government', 'ref': 'NL-1'}),
+            '/transaction?activity__id=12': simplejson.dumps([
+                {'transaction_type': 'Commitments', 'provider_org': 'BuZa', 'receiver_org': 'UNICEF',
+                 'value': '1000.00', 'transaction_date': '2010-01-01'},
+            ]),
+            '/policymarker?_order_by=code&activity__id=12&significance__gt=0':
+                '[{"description": "Gender equality", "significance": "1"}]',
+        })
+        class View(BaseProjectDetailApi):
+            api_url = self.backend.url
+            deadline = 5
+            def last_updated(self):
+                return u'2012-02-13'
+        self.view_class = View
+
+    def tearDown(self):
+        client.close()
+        self.backend.stop()
+        response_cache.clear()
+
+    def context(self, **attributes):
+        view = self.view_class(**attributes)
+        view.kwargs = {'id': '12'}
+        return view.get_context_data(id='12')
+
+    def test_calls_are_concurrent(self):
+        markers_requested = threading.Event()
+        # the transactions only come in once the policy markers are asked for
+        self.backend.server.before['/transaction'] = lambda: markers_requested.wait(10)
+        self.backend.server.before['/policymarker'] = markers_requested.set
+        context = self.context()
+        self.assertEqual(context['project']['organisation']['name'], 'BuZa')
+        self.assertEqual(len(context['commitment_list']), 1)
+        self.assertEqual(context['table'][-3], ['Description', 'Gender equality'])
+
+    def test_deadline_and_partial_failure(self):
+        release = threading.Event()
+        self.backend.server.before['/transaction'] = lambda: release.wait(10)
+        del self.backend.server.responses['/organisation/3/']
+        started = time.time()
+        context = self.context(deadline=0.5)
+        release.set()
+        self.assertTrue(time.time() - started < 5)
+        self.assertEqual(context['project']['organisation'], {'name': None, 'type': None, 'ref': None})
+        self.assertEqual(context['commitment_list'], [])
+
+    def test_missing_project_raises_404(self):
+        del self.backend.server.responses['/activity/12/']
+        self.assertRaises(Http404, self.context)
+
+    def test_not_queued_behind_searches(self):
+        release = threading.Event()
+        busy = [run_async(release.wait, 10) for i in range(20)]
+        try:
+            context = self.context(deadline=2)
+            self.assertEqual(len(context['commitment_list']), 1)
+        finally:
+            release.set()
+        for result in busy:
+            result.get(10)
+
+
+def backend_activity(i):
+    return dict(id=i, title=u'Activity %s' % i, description=u'', recipient_country_code=u'ML' if i % 2 else u'BF',
+                start_actual=None, total_budget=u'%s.00' % (i * 100), sector=u'Basic education', sector_code=u'11220')
+
+
+class BackendPaginationTest(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        activities = [backend_activity(i) for i in range(5)]
+        self.backend = StubBackend({
+            '/activity': simplejson.dumps(activities),
+            '/activity/summary': simplejson.dumps({
+                'count': 5,
+                'countries': {'ML': {'count': 2, 'total_budget': '400.00'}, 'BF': {'count': 3, 'total_budget': '600.00'}},
+                'sectors': [{'sector_code': '11220', 'sector': 'Basic education'}],
+                'largest_budget': '400.00',
+            }),
+        })
+        for offset in range(0, 5):
+            for limit in range(1, 4):
+                self.backend.server.responses['/activity?_limit=%s&_offset=%s' % (limit, offset)] = \
+                    simplejson.dumps(activities[offset:offset + limit])
+        class View(WhereaidApi):
+            api_url = self.backend.url
+            backend_pagination = True
+            summary_handler = 'activity/summary'
+            order_by = None
+            def last_updated(self):
+                return u'2012-02-13'
+        self.view = View()
+        self.querydict = dict(query='', countries=[], regions=[], budget=[], sectors=[])
+        self.chunk_size = BackendActivityList.chunk_size
+
+    def tearDown(self):
+        BackendActivityList.chunk_size = self.chunk_size
+        client.close()
+        self.backend.stop()
+        response_cache.clear()
+
+    def test_slicing_fetches_only_the_slice(self):
+        activities = BackendActivityList(self.view, self.querydict, 5)
+        self.assertEqual([activity['id'] for activity in activities[1:4]], [1, 2, 3])
+        self.assertEqual(len(self.backend.server.requests), 1)
+        self.assertEqual(sorted(self.backend.server.requests[0].split('?&')[1].split('&')), ['_limit=3', '_offset=1'])
+        self.assertEqual(activities[4]['id'], 4)
+        self.assertEqual(activities[-2]['id'], 3)
+        self.assertEqual(activities[5:], [])
+        self.assertRaises(IndexError, activities.__getitem__, 5)
+
+    def test_paginator(self):
+        paginator = Paginator(BackendActivityList(self.view, self.querydict, 5), 2)
+        self.assertEqual(paginator.count, 5)
+        self.assertEqual([activity['id'] for activity in paginator.page(2).object_list], [2, 3])
+        self.assertTrue(self.view.paginates_on_backend())
+        self.view.summary_handler = None
+        self.assertFalse(self.view.paginates_on_backend())
+
+    def test_iter_search_pages(self):
+        BackendActivityList.chunk_size = 2
+        # exports are paged without API_PAGINATION too
+        self.view.backend_pagination = False
+        ids = [activity['id'] for activity in self.view.iter_search(**self.querydict)]
+        self.assertEqual(ids, range(5))
+        self.assertEqual(len(self.backend.server.requests), 3)
+        self.assertEqual(len(response_cache.entries), 0)
+
+    def test_summary(self):
+        summary = self.view.summarize(**self.querydict)
+        self.assertTrue(isinstance(summary, SearchSummary))
+        self.assertEqual(len(summary), 5)
+        self.assertEqual(summary.country_totals()['BF'], (3, Decimal('600.00')))
+        self.assertEqual(summary.facets()['sectors'], set([('11220', 'Basic education')]))
+
+    def test_summary_without_handler(self):
+        del self.backend.server.responses['/activity/summary']
+        summary = self.view.summarize(**self.querydict)
+        self.assertEqual(len(summary), 5)
+        self.assertEqual(summary.country_totals()['BF'], (3, Decimal('600.00')))
+        self.assertEqual(summary.facets()['largest_budget'], Decimal('400.00'))
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        self.cache = ResponseCache(maxsize=2, timeouts={'activity': 60, 'transaction': -1})
+        self.token = '2012-02-13'
+        self.cache.validate(self.token)
+
+    def test_key_is_normalized(self):
+        self.cache.set('activity/12', {'b': '2', 'a': '1'}, 'project', self.token)
+        self.assertEqual(self.cache.get('activity/12/', {'a': '1', 'b': '2'}), 'project')
+
+    def test_per_handler_timeout(self):
+        self.cache.set('transaction', {'activity__id': '12'}, [], self.token)
+        self.assertEqual(self.cache.get('transaction', {'activity__id': '12'}), None)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set('activity', {}, 'all', self.token)
+        self.cache.set('activity', {'sector_code': '110'}, 'education', self.token)
+        self.cache.get('activity', {})
+        self.cache.set('activity', {'sector_code': '120'}, 'health', self.token)
+        self.assertEqual(self.cache.get('activity', {}), 'all')
+        self.assertEqual(self.cache.get('activity', {'sector_code': '110'}), None)
+
+    def test_size_bounded(self):
+        cache = ResponseCache(maxsize=100, max_bytes=1000)
+        cache.set('activity', {}, 'all', None, size=600)
+        cache.set('activity', {'sector_code': '110'}, 'education', None, size=300)
+        cache.set('activity', {'sector_code': '120'}, 'health', None, size=300)
+        self.assertEqual(cache.get('activity', {}), None)
+        self.assertEqual(cache.size, 600)
+        # too large to be cached at all
+        cache.set('activity', {'sector_code': '130'}, 'water', None, size=2000)
+        self.assertEqual(cache.get('activity', {'sector_code': '130'}), None)
+        self.assertEqual(cache.get('activity', {'sector_code': '110'}), 'education')
+
+    def test_new_token_invalidates_all_entries(self):
+        self.cache.set('activity', {}, 'all', self.token)
+        self.cache.validate('2012-02-13')
+        self.assertEqual(self.cache.get('activity', {}), 'all')
+        self.cache.validate('2012-02-14')
+        self.assertEqual(self.cache.get('activity', {}), None)
+
+    def test_older_token_neither_invalidates_nor_fills(self):
+        self.cache.validate('2012-02-14 10:00:00')
+        self.cache.set('activity', {}, 'new', '2012-02-14 10:00:00')
+        # a request that started before the change
+        self.cache.validate(self.token)
+        self.assertEqual(self.cache.get('activity', {}), 'new')
+        self.cache.set('activity', {'sector_code': '110'}, 'old', self.token)
+        self.assertEqual(self.cache.get('activity', {'sector_code': '110'}), None)
+
+
+class FreshnessTokenTest(TestCase):
+    def setUp(self):
+        cache.delete(FreshnessToken.cache_key)
+        self.tokens = ['2012-02-13', '2012-02-14']
+        self.fetched = 0
+
+    def fetch(self):
+        # any check after the last token finds it unchanged
+        self.fetched += 1
+        return self.tokens[min(self.fetched, len(self.tokens)) - 1]
+
+    def test_checked_once_per_interval(self):
+        token = FreshnessToken(self.fetch, interval=60)
+        self.assertEqual(token.get(), '2012-02-13')
+        self.assertEqual(token.get(), '2012-02-13')
+        self.assertEqual(self.fetched, 1)
+
+    def test_shared_through_cache(self):
+        FreshnessToken(self.fetch, interval=60).get()
+        self.assertEqual(FreshnessToken(self.fetch, interval=60).get(), '2012-02-13')
+        self.assertEqual(self.fetched, 1)
+
+    def test_stale_while_revalidate(self):
+        refreshing = threading.Event()
+        def fetch():
+            if self.fetched:
+                # hold the background refresh until the stale value is served
+                refreshing.wait(10)
+            return self.fetch()
+        token = FreshnessToken(fetch, interval=0)
+        token.get()
+        self.assertEqual(token.get(), '2012-02-13')
+        self.assertTrue(token.refreshing)
+        refreshing.set()
+        deadline = time.time() + 10
+        while token.refreshing and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(token.token, '2012-02-14')
+        self.assertEqual(self.fetched, 2)
+
+    def test_poll_delay(self):
+        token = FreshnessToken(self.fetch, interval=60)
+        delays = [token.poll_delay() for i in range(20)]
+        self.assertTrue(48 <= min(delays) <= max(delays) <= 72)
+        self.assertTrue(len(set(delays)) > 1)
+        self.assertTrue(96 <= token.poll_delay(failures=1) <= 144)
+        self.assertTrue(token.poll_delay(failures=10) <= token.max_backoff * 1.2)
+
+
+class ViewTestCase(TestCase):
+    """
+    Requests the search and project pages from the real views, with a
+    StubBackend as the backend and `self.token` as its last_updated value.
+    Searches go to `self.index`, and `self.searches` counts them.
+    """
+    page_cache = None
+
+    def setUp(self):
+        response_cache.clear()
+        self.token = u'2012-02-13 10:00:00'
+        self.index = ActivityIndex(ActivityStore.from_dicts(index_activities()))
+        self.index.token = self.token
+        self.searches = 0
+        self.backend = StubBackend({
+            '/activity/12/': simplejson.dumps(PROJECT),
+            '/organisation/3/': simplejson.dumps({'name': 'BuZa', 'type': 'Government', 'ref': 'NL-1'}),
+            '/transaction?activity__id=12': '[]',
+            '/policymarker?_order_by=code&activity__id=12&significance__gt=0': '[]',
+        })
+        borders.indexes = BorderSnapshot([
+            dict(iso2=iso, iso3=iso, name=COUNTRY_REVERSED[iso], region=2, subregion=11, lon=0, lat=0)
+            for iso in ('ML', 'BF', 'GH')
+        ]).indexes
+        test = self
+        class Backend(object):
+            api_url = self.backend.url
+            page_cache = self.page_cache
+            def last_updated(self):
+                return test.token
+        class Search(Backend, WhereaidApi):
+            search_index = True
+            def get_index(self):
+                test.searches += 1
+                return test.index
+        class ProjectDetail(Backend, ProjectDetailApi):
+            pass
+        self.views = dict(search=Search.as_view(), project=ProjectDetail.as_view())
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        client.close()
+        self.backend.stop()
+        response_cache.clear()
+        borders.invalidate()
+
+    def get(self, view, query=None, **headers):
+        """
+        Requests `view`, 'search' or 'project' (the project with id 12).
+        """
+        kwargs = {'id': '12'} if view == 'project' else {}
+        return self.views[view](self.factory.get('/', query or {}, **headers), **kwargs)
+
+
+class ConditionalGetTest(ViewTestCase):
+    def test_validators(self):
+        response = self.get('search', {'query': 'water'})
+        self.assertEqual(response['Last-Modified'], 'Mon, 13 Feb 2012 10:00:00 GMT')
+        self.assertTrue(response.has_header('ETag'))
+        self.assertEqual(token_time('2012-02-13'), token_time('2012-02-13 00:00:00'))
+        self.assertEqual(token_time('unknown'), None)
+
+    def test_etag_match_is_not_searched(self):
+        etag = self.get('search', {'countries': ['ML', 'BF'], 'query': 'water'})['ETag']
+        response = self.get('search', {'query': 'water', 'countries': ['ML', 'BF']}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.searches, 1)
+        # the compressed variant validates too
+        response = self.get('search', {'query': 'water', 'countries': ['ML', 'BF']}, HTTP_IF_NONE_MATCH=etag[:-1] + ';gzip"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_with_query_and_token(self):
+        etag = self.get('search', {'query': 'water'})['ETag']
+        self.assertEqual(self.get('search', {'query': 'food'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.token = u'2012-02-14 10:00:00'
+        self.assertEqual(self.get('search', {'query': 'water'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        self.assertEqual(self.get('project', HTTP_IF_MODIFIED_SINCE='Mon, 13 Feb 2012 10:00:00 GMT').status_code, 304)
+        self.assertEqual(self.get('project', HTTP_IF_MODIFIED_SINCE='Mon, 13 Feb 2012 09:00:00 GMT').status_code, 200)
+
+    def test_degraded_page_has_no_validators(self):
+        organisation = self.backend.server.responses.pop('/organisation/3/')
+        response = self.get('project')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag') or response.has_header('Last-Modified'))
+        self.backend.server.responses['/organisation/3/'] = organisation
+        self.assertTrue(self.get('project').has_header('ETag'))
+
+    def test_page_of_a_syncing_index_has_no_validators(self):
+        self.index.token = u'2012-02-13 09:00:00'
+        self.assertFalse(self.get('search').has_header('ETag'))
+        self.index.token = self.token
+        self.assertTrue(self.get('search').has_header('ETag'))
+
+
+class PageCacheTest(ViewTestCase):
+    def setUp(self):
+        self.page_cache = PageCache()
+        super(PageCacheTest, self).setUp()
+
+    def test_hit_is_not_searched(self):
+        body = self.get('search', {'query': 'water', 'page': '1'}).content
+        response = self.get('search', {'page': '1', 'query': 'water'}, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(self.searches, 1)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        self.assertEqual(gzip.GzipFile(fileobj=StringIO(response.content)).read(), body)
+        self.assertEqual(self.get('search', {'query': 'water', 'page': '1'}).content, body)
+        self.assertEqual(self.page_cache.stats()['hit_ratio'], 2 / 3.0)
+
+    def test_new_token_drops_pages(self):
+        self.get('search', {'query': 'water'})
+        self.token = self.index.token = u'2012-02-14 10:00:00'
+        self.get('search', {'query': 'water'})
+        self.assertEqual(self.searches, 2)
+        self.assertEqual(len(self.page_cache.entries), 1)
+
+    def test_memory_budget(self):
+        self.get('search', {'query': 'water'})
+        self.page_cache.max_bytes = self.page_cache.size * 2
+        for query in ('schools', 'training', 'latrines'):
+            self.get('search', {'query': query})
+        stats = self.page_cache.stats()
+        self.assertTrue(stats['bytes'] <= self.page_cache.max_bytes)
+        self.assertTrue(stats['evictions'] > 0)
+        self.get('search', {'query': 'latrines'})
+        self.assertEqual(self.searches, 4)
+
+    def test_degraded_page_is_not_stored(self):
+        del self.backend.server.responses['/organisation/3/']
+        self.get('project')
+        self.get('project')
+        self.assertEqual(self.backend.server.requests.count('/organisation/3/'), 2)
+        self.assertEqual(len(self.page_cache.entries), 0)
+
+    def test_page_of_a_syncing_index_is_not_stored(self):
+        self.index.token = u'2012-02-13 09:00:00'
+        self.get('search')
+        self.get('search')
+        self.assertEqual(self.searches, 2)
+        self.assertEqual(len(self.page_cache.entries), 0)
+
+
+class CountryMatcherTest(TestCase):
+    def test_match_returns_codes_and_cleaned_query(self):
+        self.assertEqual(country_matcher.match(u'water mali  burkina faso'), ([u'ML', u'BF'], u'water'))
+
+    def test_longest_name_wins(self):
+        self.assertEqual(country_matcher.match(u'Nigeria')[0], [u'NG'])
+        self.assertEqual(country_matcher.match(u'Papua New Guinea')[0], [u'PG'])
+
+    def test_accents_and_alternative_names(self):
+        self.assertEqual(country_matcher.match(u"sant\xe9 C\xf4te d'Ivoire"), ([u'CI'], u'sante'))
+        self.assertEqual(country_matcher.match(u'Vietnam')[0], [u'VN'])
+
+
+class CountryRegistryTest(TestCase):
+    def test_lookups(self):
+        self.assertEqual(country_registry.to_iso(u'\xe5land ISLANDS'), u'AX')
+        self.assertEqual(country_registry.to_iso(u'Atlantis'), None)
+        self.assertEqual(country_registry.to_name(u'ml'), u'Mali')
+        self.assertEqual(country_registry.to_name(None), u'')
+
+    def test_subregions(self):
+        borders = BorderSnapshot([
+            dict(iso2='ML', subregion=11, name=u'Mali'),
+            dict(iso2='BF', subregion=11, name=u'Burkina Faso'),
+            dict(iso2='NL', subregion=155, name=u'Netherlands'),
+        ])
+        registry = CountryRegistry(COUNTRY, COUNTRY_REVERSED, borders)
+        self.assertEqual(registry.subregions_of(['ML', 'NL', 'XX']), set([11, 155]))
+        self.assertEqual(registry.countries_in(['11']), set(['ML', 'BF']))
+        self.assertEqual(borders.get('NL')['name'], u'Netherlands')
+
+
+class UnicodeCSVStreamTest(TestCase):
+    def test_rows_are_encoded_in_chunks(self):
+        rows = [[u'a,b', u'\xe9'], [u'x', None], [u'y', u'z']]
+        chunks = list(UnicodeCSVStream(chunk_size=10).iterrows(rows))
+        self.assertEqual(chunks, ['"a,b",\xc3\xa9\r\n', 'x,\r\ny,z\r\n'])
+
+    def test_is_lazy(self):
+        def rows():
+            yield [u'first']
+            raise AssertionError('read too far')
+        self.assertEqual(UnicodeCSVStream(chunk_size=1).iterrows(rows()).next(), 'first\r\n')
+
+
+class ExportViewTest(ViewTestCase):
+    def setUp(self):
+        super(ExportViewTest, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.export_root = getattr(settings, 'EXPORT_ROOT', None)
+        settings.EXPORT_ROOT = self.root
+
+    def tearDown(self):
+        settings.EXPORT_ROOT = self.export_root
+        shutil.rmtree(self.root)
+        super(ExportViewTest, self).tearDown()
+
+    def test_export_of_a_syncing_index_is_not_kept(self):
+        self.index.token = u'2012-02-13 09:00:00'
+        body = ''.join(self.get('search', {'query': 'schools', 'format': 'csv'}))
+        self.assertTrue('Training for rural schools' in body)
+        self.assertEqual(os.listdir(self.root), [])
+        self.index.token = self.token
+        self.assertEqual(''.join(self.get('search', {'query': 'schools', 'format': 'csv'})), body)
+        self.assertEqual(len(os.listdir(self.root)), 1)
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'export.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=100-', 100), 'unsatisfiable')
+        self.assertEqual(parse_range('bytes=0-1,5-6', 100), None)
+        self.assertEqual(parse_range(None, 100), None)
+
+    def test_tee_writes_complete_exports_only(self):
+        chunks = tee(iter(['a', 'b']), self.path)
+        chunks.next()
+        chunks.close()
+        self.assertEqual(os.listdir(self.root), [])
+        self.assertEqual(list(tee(iter(['a', 'b']), self.path)), ['a', 'b'])
+        self.assertEqual(open(self.path).read(), 'ab')
+
+
+class CurrencyFormatterTest(TestCase):
+    def setUp(self):
+        self.formatter = CurrencyFormatter(u'\u20ac ', '.', ',')
+
+    def test_grouping_and_rounding(self):
+        self.assertEqual(self.formatter.format('999'), u'\u20ac 999')
+        self.assertEqual(self.formatter.format('1234567.5'), u'\u20ac 1.234.568')
+        self.assertEqual(self.formatter.format('-123456'), u'\u20ac -123.456')
+
+    def test_cents(self):
+        self.assertEqual(self.formatter.format('1234.5', places=2), u'\u20ac 1.234,50')
+        self.assertEqual(self.formatter.format_column(['1', '-0.994'], places=2), [u'\u20ac 1,00', u'\u20ac -0,99'])
+
+
+class ActivityStoreTest(TestCase):
+    def setUp(self):
+        activities = []
+        for i, (iso, budget) in enumerate([('ML', '100.50'), ('BF', 20), (None, '-3.25'), ('ML', '7')]):
+            activities.append(dict(id=i, title=u'Activity %s' % i, description=u'', recipient_country_code=iso,
+                                   start_actual=u'2010-01-01', total_budget=budget, sector=u'Education',
+                                   sector_code=u'11220', reporting_organisation=u'dropped'))
+        self.store = ActivityStore.from_dicts(activities)
+
+    def test_rows(self):
+        self.assertEqual(len(self.store), 4)
+        row = self.store[0]
+        self.assertEqual((row['id'], row['recipient_country_code'], row['total_budget']), (0, 'ML', u'100.50'))
+        self.assertEqual(self.store[2]['total_budget'], u'-3.25')
+        self.assertEqual(row.get('reporting_organisation'), None)
+        self.assertEqual([row['id'] for row in self.store[1:3]], [1, 2])
+
+    def test_group_by_and_sort(self):
+        self.assertEqual(self.store.country_totals(), {'ML': (2, Decimal('107.50')), 'BF': (1, Decimal('20.00'))})
+        facets = self.store.facets()
+        self.assertEqual(facets['countries'], set(['ML', 'BF']))
+        self.assertEqual(facets['largest_budget'], Decimal('100.50'))
+        names = {'ML': u'Mali', 'BF': u'Burkina Faso', None: u''}
+        by_country = self.store.sorted_by_country(names.get)
+        self.assertEqual([row['id'] for row in by_country], [2, 1, 0, 3])
+        self.assertEqual(by_country.country_totals(), self.store.country_totals())
+
+
+def index_activities():
+    rows = [
+        ('ML', '11220', u'Basic education', u'Schools in Mopti', u'Building primary schools', '50000'),
+        ('BF', '11220', u'Basic education', u'Teacher training', u'Training for rural schools', '200000'),
+        ('ML', '14030', u'Water supply', u'Clean water', u'Wells for S\xe9gou', '1000000'),
+        ('GH', '14030', u'Water supply', u'Water and sanitation', u'Latrines in Tamale schools', '5000'),
+    ]
+    return [dict(id=i, recipient_country_code=iso, sector_code=code, sector=sector, title=title,
+                 description=description, total_budget=budget, start_actual=u'2011-0%s-01' % (4 - i))
+            for i, (iso, code, sector, title, description, budget) in enumerate(rows)]
+
+
+class ActivityIndexTest(TestCase):
+    def setUp(self):
+        borders = BorderSnapshot([dict(iso2=iso, subregion=11) for iso in ('ML', 'BF', 'GH')])
+        registry = CountryRegistry(COUNTRY, COUNTRY_REVERSED, borders)
+        self.index = ActivityIndex(ActivityStore.from_dicts(index_activities()), registry)
+
+    def ids(self, **filters):
+        return [row['id'] for row in self.index.search(**filters)]
+
+    def test_updated_compacts_replaced_rows(self):
+        index = self.index
+        for i in range(10):
+            index = index.updated([dict(index_activities()[2], title=u'Clean water %s' % i)])
+            self.assertTrue(len(index.store.columns.ids) <= index.size * 1.5 + 1)
+        self.assertEqual([row['title'] for row in index.search(query=u'clean water')], [u'Clean water 9'])
+        self.assertEqual(self.ids(query=u'clean water'), [2])
+        self.assertEqual(len(self.index.store), 4)
+
+    def test_country_totals_follow_the_index(self):
+        def totals(index, last_updated):
+            view = WhereaidApi()
+            view.index = index
+            view.last_updated = lambda: last_updated
+            view.querydict = dict(query=u'', countries=[], regions=[], budget=[], sectors=[])
+            view.summary = index.search()
+            return view._get_country_totals()
+        self.index.token = u'1'
+        response_cache.clear()
+        self.assertEqual(totals(self.index, u'1')['ML'], (2, Decimal('1050000.00')))
+        # while the mirror syncs, the totals are those of the index searched
+        self.assertEqual(totals(self.index, u'2')['ML'], (2, Decimal('1050000.00')))
+        synced = self.index.updated([dict(index_activities()[2], recipient_country_code='GH')])
+        synced.token = u'2'
+        self.assertEqual(totals(synced, u'2')['ML'], (1, Decimal('50000.00')))
+        response_cache.clear()
+
+    def test_keywords(self):
+        self.assertEqual(self.ids(query=u'schools'), [0, 1, 3])
+        self.assertEqual(self.ids(query=u'SEGOU'), [2])
+        self.assertEqual(self.ids(query=u'school'), [0, 1, 3])
+        self.assertEqual(self.ids(query=u'rural schools'), [1])
+        self.assertEqual(self.ids(query=u'schools rural'), [])
+
+    def test_infix_keywords(self):
+        self.assertEqual(self.ids(query=u'chools'), [0, 1, 3])
+        self.assertEqual(self.ids(query=u'ater and sanit'), [3])
+        activities = index_activities()
+        activities[0].update(title=u'Drinkwatervoorziening', description=u'Preschools in Mopti')
+        index = ActivityIndex(ActivityStore.from_dicts(activities), self.index.registry)
+        self.assertEqual([row['id'] for row in index.search(query=u'water')], [0, 2, 3])
+        self.assertEqual([row['id'] for row in index.search(query=u'schools in')], [0])
+
+    def test_filters_and_order(self):
+        self.assertEqual(self.ids(countries=['ML'], sectors=['14030']), [2])
+        self.assertEqual(self.ids(budget='50000'), [1, 2])
+        self.assertEqual(self.ids(order_by='-total_budget'), [2, 1, 0, 3])
+        self.assertEqual(self.ids(order_by='start_actual'), [3, 2, 1, 0])
+        self.assertEqual(self.ids(order_by='recipient_country', offset=1, limit=2), [3, 0])
+
+    def test_facets(self):
+        facets = self.index.facets(('countries', 'sectors'), query=u'schools', countries=['ML'])
+        self.assertEqual(facets['countries']['country_counts'], {'ML': 1, 'BF': 1, 'GH': 1})
+        self.assertEqual(facets['sectors']['sectors'], set([('11220', u'Basic education')]))
+        self.assertEqual(facets['sectors']['budget_counts'][10000], 1)
+        self.assertEqual(facets['countries']['region_counts'], {11: 3})
+        # nothing matches, so the facets are those of the keywords alone
+        facets = self.index.facets(('countries',), query=u'schools', countries=['NL'])
+        self.assertEqual(facets['countries']['countries'], set(['ML', 'BF', 'GH']))
+
+    def test_updated(self):
+        changed = index_activities()[1:2]
+        changed[0].update(title=u'Teacher salaries', recipient_country_code='GH', total_budget='1')
+        new = dict(index_activities()[0], id=9, title=u'New schools')
+        index = self.index.updated([changed[0], new])
+        self.assertEqual(index.size, 5)
+        # changed activities move to the end of the default order
+        self.assertEqual([row['id'] for row in index.search(query=u'schools')], [0, 3, 1, 9])
+        self.assertEqual([row['id'] for row in index.search(query=u'salaries', countries=['GH'])], [1])
+        self.assertEqual([row['id'] for row in index.search(order_by='total_budget')], [1, 3, 0, 9, 2])
+        # the old index is unchanged
+        self.assertEqual(self.ids(countries=['BF']), [1])
+        self.assertEqual(self.ids(query=u'teacher training'), [1])
+
+
+class ActivityMirrorTest(TestCase):
+    def setUp(self):
+        activities = index_activities()
+        changed = [dict(activities[2], title=u'Clean water for Mopti')]
+        self.backend = StubBackend({
+            '/activity': simplejson.dumps(activities),
+            '/transaction': simplejson.dumps([
+                dict(id=1, activity_id=2, transaction_type='Commitments', value='10'),
+                dict(id=2, activity_id=2, transaction_type='Disbursements', value='5'),
+            ]),
+            '/policymarker': simplejson.dumps([
+                dict(id=1, activity_id=2, code=2, significance=1),
+                dict(id=2, activity_id=2, code=1, significance=2),
+                dict(id=3, activity_id=3, code=1, significance=0),
+            ]),
+            '/activity?last_updated__gt=1': simplejson.dumps(changed),
+            '/transaction?last_updated__gt=1': simplejson.dumps([
+                dict(id=2, activity_id=2, transaction_type='Disbursements', value='7'),
+            ]),
+            '/policymarker?last_updated__gt=1': simplejson.dumps([
+                dict(id=1, activity_id=2, code=2, significance=0),
+            ]),
+        })
+        self.mirror = ActivityMirror(backend_fetcher(self.backend.url))
+
+    def tearDown(self):
+        client.close()
+        self.backend.stop()
+
+    def test_load_and_sync(self):
+        index = self.mirror.get(u'1')
+        self.assertEqual((index.size, index.token), (4, u'1'))
+        self.assertEqual([marker['code'] for marker in self.mirror.policy_markers[2]], [1, 2])
+        self.assertEqual(self.mirror.policy_markers[3], [])
+
+        self.mirror.update(u'2')
+        self.assertEqual((self.mirror.index.size, self.mirror.index.token), (4, u'2'))
+        self.assertEqual([row['id'] for row in self.mirror.index.search(query=u'mopti')], [0, 2])
+        self.assertEqual([t['value'] for t in self.mirror.transactions[2]], ['10', '7'])
+        self.assertEqual([marker['code'] for marker in self.mirror.policy_markers[2]], [1])
+
+        stats = self.mirror.stats()
+        self.assertEqual((stats['token'], stats['lag']), (u'2', 0))
+        self.assertEqual([(batch['full'], batch['activities']) for batch in stats['batches']], [(True, 4), (False, 1)])
+        self.assertEqual(len(self.backend.server.requests), 6)
+
+    def test_reload_without_last_updated_filter(self):
+        self.mirror.get(u'1')
+        for handler in ('activity', 'transaction', 'policymarker'):
+            del self.backend.server.responses['/%s?last_updated__gt=1' % handler]
+        self.backend.server.responses['/transaction'] = simplejson.dumps([
+            dict(id=1, activity_id=2, transaction_type='Commitments', value='10'),
+        ])
+        self.mirror.update(u'2')
+        self.assertEqual((self.mirror.index.size, self.mirror.index.token), (4, u'2'))
+        self.assertEqual([t['value'] for t in self.mirror.transactions[2]], ['10'])
+        self.assertEqual([batch['full'] for batch in self.mirror.stats()['batches']], [True, True])
+
+
+class SharedFileCacheTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = SharedFileCache(self.dir, {'OPTIONS': {'COMPRESS_MIN_SIZE': 100}})
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_set_and_get(self):
+        self.cache.set('small', {'a': 1})
+        self.cache.set('large', 'x' * 1000)
+        self.assertEqual(self.cache.get('small'), {'a': 1})
+        self.assertEqual(self.cache.get('large'), 'x' * 1000)
+        self.assertTrue(os.path.getsize(self.cache._path(self.cache.make_key('large'))) < 100)
+        self.cache.set('expired', 1, timeout=-1)
+        self.assertEqual(self.cache.get('expired', 'default'), 'default')
+        self.assertEqual([name for name in os.listdir(self.dir) if name.endswith('.tmp')], [])
+
+    def test_get_or_fill_fills_once(self):
+        fills = []
+        def fill():
+            fills.append(1)
+            time.sleep(0.1)
+            return 'value'
+        results = []
+        def worker():
+            # a cache per thread, as in separate processes
+            cache = SharedFileCache(self.dir, {})
+            results.append(cache.get_or_fill('key', fill))
+        threads = [threading.Thread(target=worker) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(len(fills), 1)
+
+    def test_only_unused_lock_files_are_culled(self):
+        held = self.cache._acquire(os.path.join(self.dir, 'held.lock'))
+        open(os.path.join(self.dir, 'unused.lock'), 'a').close()
+        old = time.time() - self.cache.lock_timeout * 20
+        for name in ('held.lock', 'unused.lock'):
+            os.utime(os.path.join(self.dir, name), (old, old))
+        self.cache.set('key', 'value')
+        self.assertEqual(sorted(name for name in os.listdir(self.dir) if name.endswith('.lock')), ['held.lock'])
+        held.close()
+
+
+class SingleFlightTest(TestCase):
+    def test_concurrent_calls_share_one_result(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        def fetch():
+            started.set()
+            release.wait(1)
+            return object()
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+        leader.start()
+        started.wait(1)
+        followers = [threading.Thread(target=lambda: results.append(flight.do('key', fetch))) for i in range(4)]
+        for thread in followers:
+            thread.start()
+        while flight.deduplicated < 4:
+            time.sleep(0.01)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual((flight.calls_made, flight.deduplicated), (1, 4))
+        self.assertEqual(flight.calls, {})
+
+    def test_errors_are_not_kept(self):
+        flight = SingleFlight()
+        def fail():
+            raise BackendError('down')
+        self.assertRaises(BackendError, flight.do, 'key', fail)
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+
+
+class IterJsonArrayTest(TestCase):
+    text = '[{"id": 1, "title": "caf\\u00e9", "extra": [1, 2]}, 12.5 , "a,]" ,{"id": 2}]'
+
+    def test_any_chunking(self):
+        expected = simplejson.loads(self.text)
+        for size in (1, 2, 7, len(self.text)):
+            chunks = [self.text[i:i + size] for i in range(0, len(self.text), size)]
+            self.assertEqual(list(iter_json_array(chunks)), expected)
+        self.assertEqual(list(iter_json_array([' [ ', ' ] '])), [])
+
+    def test_fields(self):
+        elements = list(iter_json_array([self.text], fields=('id', 'title')))
+        self.assertEqual(elements[0], {'id': 1, 'title': u'caf\xe9'})
+        self.assertEqual(elements[3], {'id': 2, 'title': None})
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, list, iter_json_array(['{"id": 1}']))
+        self.assertRaises(ValueError, list, iter_json_array(['[{"id": 1}']))
+        self.assertRaises(ValueError, list, iter_json_array(['[{"id": 1} {"id": 2}]']))
@@ -1,4 +1,6 @@
-import csv, codecs, cStringIO
+import csv, codecs, cStringIO, re, sys
+
+from django.utils import simplejson
 
 class UTF8Recoder:
     """
@@ -57,4 +59,103 @@ class UnicodeWriter:
 
     def writerows(self, rows):
         for row in rows:
-            self.writerow(row)
\ No newline at end of file
+            self.writerow(row)
+
+
+class UnicodeCSVStream:
+    """
+    Encodes rows of unicode strings as UTF-8 CSV and yields the output in
+    chunks of about `chunk_size` bytes, for streaming responses.
+    """
+
+    def __init__(self, dialect=csv.excel, chunk_size=64 * 1024, **kwds):
+        self.dialect = dialect
+        self.chunk_size = chunk_size
+        self.kwds = kwds
+
+    def iterrows(self, rows):
+        queue = cStringIO.StringIO()
+        writer = csv.writer(queue, dialect=self.dialect, **self.kwds)
+        for row in rows:
+            writer.writerow(['' if s is None else s.encode("utf-8") for s in row])
+            if queue.tell() >= self.chunk_size:
+                yield queue.getvalue()
+                queue.seek(0)
+                queue.truncate()
+        if queue.tell():
+            yield queue.getvalue()
+
+
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+def iter_json_array(chunks, fields=None):
+    """
+    Yields the elements of the JSON array whose text arrives in `chunks`,
+    each as soon as it is complete. With `fields`, only those keys of the
+    objects in the array are kept.
+
+    Only the text of the element being parsed is buffered, never the
+    whole array.
+    """
+    decoder = simplejson.JSONDecoder()
+    chunks = iter(chunks)
+    buf, pos = '', 0
+    state = 'start'
+    while True:
+        pos = _whitespace.match(buf, pos).end()
+        if pos == len(buf):
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ValueError('JSON array ends early')
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+
+        char = buf[pos]
+        if state == 'start':
+            if char != '[':
+                raise ValueError('Expected a JSON array')
+            pos += 1
+            state = 'first'
+        elif state in ('first', 'separator') and char == ']':
+            return
+        elif state == 'separator':
+            if char != ',':
+                raise ValueError('Expected "," or "]" at %s' % pos)
+            pos += 1
+            state = 'element'
+        else:
+            try:
+                element, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                element, end = None, None
+            after = end is not None and _whitespace.match(buf, end).end()
+            if end is None or after == len(buf) or buf[after] not in ',]':
+                # incomplete, or a number that may go on in the next chunk
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    buf, pos = buf[pos:] + chunk, 0
+                    continue
+                if end is None:
+                    raise ValueError('Invalid JSON array element at %s' % pos)
+            if fields is not None and isinstance(element, dict):
+                element = dict((field, element.get(field)) for field in fields)
+            yield element
+            pos = end
+            state = 'separator'
+
+def deep_size(obj, seen=None):
+    """
+    Returns the approximate size in bytes of `obj` and everything it refers to.
+    """
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_size(obj.__dict__, seen)
+    return size
@@ -6,26 +6,111 @@ from django.views.generic.base import View, TemplateResponseMixin
 from django.utils.http import urlencode
 from django.http import Http404, HttpResponse
 from django.core.cache import cache
-from settings import API_URL
+from django.utils.hashcompat import md5_constructor
+from settings import API_URL, API_DEADLINE, API_PAGINATION, API_SUMMARY_HANDLER, SEARCH_INDEX
 
-from world.models import WorldBorder
-from website.forms import FilterForm, SearchForm
+from world.snapshot import borders
+from website.forms import FilterForm, SearchForm, querydict_key
 from website.templatetags.country import iso_to_country
 from website.templatetags.cur import currency
-from website.utils import UnicodeWriter
+from website.utils import UnicodeWriter, iter_json_array
+from website.export import EXPORT_FORMATS, export_path, csv_chunks, jsonl_chunks, write_chunks, write_xlsx, tee, streaming_response, serve_export
 from website.templatetags.significance import code_to_significance
+from website.backend import client, run_async_on, BackendError
+from website.apicache import response_cache, in_flight
+from website.activitystore import ActivityStore, SearchSummary, FIELDS
+from website.mirror import activity_mirror
+from website.conditional import ConditionalGetMixin
+from website.pagecache import PageCacheMixin, page_cache
+from website import freshness
 
-from urllib2 import urlopen, URLError
 from urlparse import urljoin
 from datetime import datetime
 from decimal import Decimal
+from multiprocessing import TimeoutError
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+REQUIRED = object()
+
+# activity fields in the JSON Lines export
+EXPORT_FIELDS = ('id', 'title', 'description', 'recipient_country_code', 'start_actual', 'total_budget', 'sector', 'sector_code')
+
+# stands in for an organisation that couldn't be fetched
+UNKNOWN_ORGANISATION = {'name': None, 'type': None, 'ref': None}
 
 class ApiMixin(object):
+    api_url = API_URL
+    # set once an optional backend call fell back to its default, see `wait`
+    degraded = False
+    
     def connect(self, handler, **query):
-        url = urljoin(API_URL, handler)
         # removes queries with empty values
         query = self.filter_querydict(query)
-        is_empty_query = not bool(query) #save for later reference
+        
+        # cached responses are only valid for the current backend data
+        response_cache.validate(self.last_updated())
+        json = response_cache.get(handler, query)
+        if json is None:
+            # concurrent identical calls wait for the first one
+            key = (self.last_updated(), response_cache.key(handler, query))
+            json = in_flight.do(key, lambda: self.fill(key, handler, query))
+        return json
+    
+    def fill(self, key, handler, query):
+        # a call that finished just before this one started may have filled it
+        json = response_cache.get(handler, query)
+        if json is not None:
+            return json
+        if hasattr(cache, 'get_or_fill'):
+            # shared by the processes on this host, only one of them fetches it
+            json = cache.get_or_fill('api:%s' % md5_constructor(repr(key)).hexdigest(),
+                                     lambda: self.fetch(handler, query), response_cache.timeout_for(handler))
+        else:
+            json = self.fetch(handler, query)
+        # the key starts with the last_updated value the call was made for
+        response_cache.set(handler, query, json, key[0])
+        return json
+    
+    def fetch(self, handler, query):
+        if handler == 'activity':
+            return self.activities_or_404(self.build_url(handler, query))
+        return self.json_or_404(self.build_url(handler, query))
+    
+    def connect_async(self, handler, **query):
+        """
+        Starts `connect` on the thread pool of the project pages, apart from
+        the one the facet searches run on.
+        
+        Use `wait` to get the result.
+        """
+        # resolve it here, so the threads don't race to set it
+        self.last_updated()
+        return run_async_on('detail', self.connect, handler, **query)
+    
+    def wait(self, result, deadline, default=REQUIRED):
+        """
+        Returns the result of `connect_async` once it is in, waiting no
+        longer than `deadline`.
+        
+        A failed or late optional call returns `default` instead, and marks
+        the response as degraded so it isn't cached.
+        """
+        try:
+            return result.get(max(0, deadline - time.time()))
+        except (Http404, TimeoutError):
+            if default is REQUIRED:
+                raise Http404
+            logger.warning('Backend call failed or timed out, using %r', default)
+            self.degraded = True
+            return default
+    
+    def build_url(self, handler, query):
+        url = urljoin(self.api_url, handler)
+        query = query.copy()
         
         if query:
             url += '?'
@@ -36,48 +121,73 @@ class ApiMixin(object):
                     url += '|'.join(urlencode({i : v}) for i in k.split('|'))
         if query:
             url += '&' + urlencode(query).replace('%7C', '|')
+        return url
+    
+    def last_updated(self):
+        """
+        The backend's last_updated value, fixed for the rest of the request.
         
-        if handler == 'activity' and is_empty_query:
-            # Handles caching for the main search page
-            cached_data = cache.get('all-activities')
-            remote_last_updated = unicode(self.html_or_404(urljoin(API_URL, 'last_updated/')))
-            cache_invalid = cache.get('last_updated') != remote_last_updated
-            
-            if cached_data and not cache_invalid:
-                # Cache hit!
-                json = cached_data
-            else:
-                # No cache! Get data and fill cache
-                json = self.json_or_404(url)
-                cache.set('all-activities', json, 60*60*24)
-                cache.set('last_updated', remote_last_updated)
-        else:
-            json = self.json_or_404(url)
-        return json
+        See website.freshness for how often the backend is actually asked.
+        """
+        if not hasattr(self, '_last_updated'):
+            try:
+                self._last_updated = freshness.last_updated.get()
+            except BackendError:
+                raise Http404
+        return self._last_updated
+    
+    def data_token(self):
+        """
+        The backend's last_updated value of the data the response is made of.
+        """
+        return self.last_updated()
+    
+    def is_current(self):
+        """
+        Returns whether the response just made is complete and made from the
+        data at `last_updated`. Only those are cached or get validators.
+        """
+        return not self.degraded and self.data_token() == self.last_updated()
     
     def filter_querydict(self, querydict):
         return dict([(k, v) for k, v in querydict.items() if v not in['', None, []]])
     
     def html_or_404(self, url):
         try:
-            return urlopen(url).read()
-        except URLError:
+            return client.get(url)
+        except BackendError:
             raise Http404
         
     def json_or_404(self, url):
         try:
-            response = urlopen(url)
-            return simplejson.load(response)
-        except URLError:
+            return simplejson.loads(client.get(url))
+        except BackendError:
+            raise Http404
+    
+    def activities_or_404(self, url):
+        """
+        Returns an activity list as an ActivityStore, decoding each activity
+        as it arrives and keeping only the fields the views use.
+        """
+        try:
+            return ActivityStore.from_dicts(iter_json_array(client.stream(url), fields=FIELDS))
+        except BackendError:
             raise Http404
         
 
-class WhereaidApi(ApiMixin, ListView):
+class WhereaidApi(ConditionalGetMixin, PageCacheMixin, ApiMixin, ListView):
     template_name = 'website/whereaid_api.html'
     searchform_class = SearchForm
     filterform_class = FilterForm
     context_object_name = 'activity_list'
     paginate_by = 15
+    # the local ActivityIndex searches go to, if SEARCH_INDEX is enabled
+    index = None
+    # the backend handler counting and aggregating a search, see SearchSummary
+    summary_handler = API_SUMMARY_HANDLER
+    backend_pagination = API_PAGINATION
+    search_index = SEARCH_INDEX
+    page_cache = page_cache
     
     def get(self, request, *args, **kwargs):
         searchform = self.searchform_class(data=request.GET)
@@ -106,36 +216,115 @@ class WhereaidApi(ApiMixin, ListView):
             for country in countries_from_query:
                 self.modified_request.update(dict(countries=country))
 
-            self.queryset = self.search(**self.querydict)
+            if self.search_index:
+                self.index = self.get_index()
+            
+            format = self.request.GET.get('format')
+            if format in EXPORT_FORMATS:
+                return self.render_to_export_response(format)
+            
+            summary = None
+            if self.paginates_on_backend():
+                # only the shown page is fetched in the requested order, the
+                # summary is shared by all pages and sort orders
+                summary = self.summarize(**self.querydict)
+            if isinstance(summary, SearchSummary):
+                self.summary = summary
+                self.queryset = BackendActivityList(self, self.querydict, len(summary))
+            else:
+                # the full search has the count, facets and totals too, also
+                # when the backend turned out to have no summary handler
+                self.queryset = self.summary = self.search(**self.querydict)
            
         return super(WhereaidApi, self).get(self, request, *args, **kwargs)
     
-    def search(self, query='', countries=[], regions=[], budget=[], sectors=[]):
+    def search(self, query='', countries=[], regions=[], budget=[], sectors=[], ordered=True, offset=None, limit=None):
         """
         Does a search on the backend.
         
         All the filters are rewritten to a format used by the backend.
+        Unordered searches share their cache entries between sort orders.
+        With `offset` and `limit` only that slice of the results is fetched.
+        
+        With a local index the search doesn't go to the backend at all.
         """
+        order_by = self.order_by if ordered else None
+        if self.index is not None:
+            return self.index.search(query=query, countries=countries, budget=budget, sectors=sectors,
+                                     order_by=order_by, offset=offset, limit=limit)
         qs = self.connect(
             'activity',
-            **{
-               'description__icontains|title__icontains' : query,
-               'recipient_country_code' : '|'.join(countries),
-               'total_budget__gt': budget,
-               'sector_code' : '|'.join(sectors),
-               '_order_by' : self.order_by if not self.order_by in ['recipient_country', '-recipient_country'] else None
-            }
+            _order_by=order_by if not order_by in ['recipient_country', '-recipient_country'] else None,
+            _offset=offset,
+            _limit=limit,
+            **self.backend_filters(query, countries, budget, sectors)
         )
         
         # Only country codes are stored in the DB, so we need to sort manually
         # if we want to sort by full country name
-        if self.order_by == 'recipient_country':
+        if order_by == 'recipient_country':
             return self._sort_countries(qs, reverse=False)
-        elif self.order_by == '-recipient_country':
+        elif order_by == '-recipient_country':
             return self._sort_countries(qs, reverse=True)
         else:
             return qs
         
+    def summarize(self, query='', countries=[], regions=[], budget=[], sectors=[]):
+        """
+        Returns the number of results of a search, its facets and its totals
+        per country, from the backend's summary handler.
+        
+        Without a summary handler, or with a local index, the unordered
+        search is returned instead, which answers the same.
+        """
+        if self.summary_handler is not None and self.index is None:
+            try:
+                return SearchSummary(self.connect(self.summary_handler,
+                                                  **self.backend_filters(query, countries, budget, sectors)))
+            except Http404:
+                logger.warning('The backend has no %s handler, summarizing the full search', self.summary_handler)
+        return self.search(query=query, countries=countries, budget=budget, sectors=sectors, ordered=False)
+    
+    def paginates_on_backend(self):
+        """
+        Returns whether only the shown page of results is fetched. That needs
+        the summary handler, without it the full search is fetched anyway
+        for the count, facets and totals.
+        """
+        return (self.backend_pagination and self.summary_handler is not None and self.index is None
+                and self.order_by not in ['recipient_country', '-recipient_country'])
+    
+    def backend_filters(self, query, countries, budget, sectors):
+        """
+        Rewrites the filters of a search to the backend's parameters.
+        """
+        return {
+            'description__icontains|title__icontains' : query,
+            'recipient_country_code' : '|'.join(countries),
+            'total_budget__gt': budget,
+            'sector_code' : '|'.join(sectors),
+        }
+    
+    def data_token(self):
+        """
+        The backend's last_updated value of the data searched, which lags
+        behind `last_updated` while the mirror of the index syncs.
+        """
+        if self.index is not None:
+            return self.index.token
+        return self.last_updated()
+    
+    def get_index(self):
+        """
+        Returns the index over the mirrored activities, or None to search
+        the backend if the mirror can't be loaded.
+        """
+        try:
+            return activity_mirror.get(self.last_updated())
+        except BackendError, e:
+            logger.warning('Searching the backend, the activity mirror could not be loaded: %s', e)
+            return None
+    
     def get_context_data(self, **kwargs):
         """
         Note: Forms are bound with the modified request to include extra filters
@@ -149,30 +338,79 @@ class WhereaidApi(ApiMixin, ListView):
 
         return context
 
-    def render_to_response(self, context):
-        if self.request.GET.get('format','html') == 'csv':
-            return self.render_to_csv_response(context)
-        else:
-            return ListView.render_to_response(self, context)
+    def iter_search(self, query='', countries=[], regions=[], budget=[], sectors=[]):
+        """
+        Yields all results of a search.
+        
+        The backend is asked for one page of results at a time, whatever
+        API_PAGINATION is, and the pages are not cached, so exporting a
+        search of any size takes little memory. Only sorting by country
+        name needs all results at once.
+        """
+        if self.index is not None or self.order_by in ['recipient_country', '-recipient_country']:
+            for activity in self.search(query=query, countries=countries, budget=budget, sectors=sectors):
+                yield activity
+            return
+        filters = dict(self.backend_filters(query, countries, budget, sectors), _order_by=self.order_by)
+        offset = 0
+        while True:
+            page = self.fetch('activity', self.filter_querydict(
+                dict(filters, _offset=offset, _limit=BackendActivityList.chunk_size)))
+            for activity in page:
+                yield activity
+            if len(page) < BackendActivityList.chunk_size:
+                break
+            offset += len(page)
     
-    def render_to_csv_response(self, context):
-        response = HttpResponse(mimetype='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=search_results.csv'
+    def render_to_export_response(self, format):
+        """
+        Exports all results of the search as CSV, JSON Lines or XLSX.
         
-        writer = UnicodeWriter(response)
+        The export is kept on disk for the search and the data it was made
+        from. The first CSV or JSON Lines download streams it while writing
+        it to disk, later ones are served from disk. While the mirror of the
+        index syncs, CSV and JSON Lines are only streamed.
+        """
+        signature = repr((querydict_key(self.filter_querydict(self.querydict)), self.order_by, self.data_token()))
+        path = export_path(signature, format)
+        filename = 'search_results.%s' % format
         
-        writer.writerow(['title', 'description', 'country', 'start date', 'budget', 'principal sector'])
-        for activity in context['paginator'].object_list:
+        if not os.path.exists(path):
+            activities = self.iter_search(**self.querydict)
+            if format == 'xlsx':
+                write_xlsx(path, self._csv_rows(activities))
+            else:
+                if format == 'jsonl':
+                    chunks = jsonl_chunks(self._json_records(activities))
+                else:
+                    chunks = csv_chunks(self._csv_rows(activities))
+                if not self.is_current():
+                    return streaming_response(chunks, format, filename)
+                if 'HTTP_RANGE' not in self.request.META:
+                    return streaming_response(tee(chunks, path), format, filename)
+                write_chunks(path, chunks)
+        return serve_export(self.request, path, format, filename)
+    
+    def _json_records(self, activities):
+        for activity in activities:
+            record = dict((field, activity.get(field)) for field in EXPORT_FIELDS)
+            record['country'] = iso_to_country(activity['recipient_country_code']) or None
+            yield record
+    
+    def _csv_rows(self, activities):
+        yield ['title', 'description', 'country', 'start date', 'budget', 'principal sector']
+        for activity in activities:
             title = activity['title']
             description = activity['description']
             country = iso_to_country(activity['recipient_country_code']) or "Unspecified"
             start_date = activity['start_actual']
             budget = currency(activity['total_budget'])
             sector = activity['sector']
-            writer.writerow([title, description, country, start_date, budget, sector])
-        return response
+            yield [title, description, country, start_date, budget, sector]
     
     def _sort_countries(self, qs, reverse=False):
+        if isinstance(qs, ActivityStore):
+            return qs.sorted_by_country(iso_to_country, reverse=reverse)
         return sorted(qs, key=lambda activity: iso_to_country(activity['recipient_country_code']), reverse=reverse)
         
     def _get_sorting_links(self):
@@ -183,29 +421,88 @@ class WhereaidApi(ApiMixin, ListView):
         ]
     
     def _get_map_country_information(self):
-        countries = set(project['recipient_country_code'] for project in self.queryset if project['recipient_country_code'])
-        countries = list(WorldBorder.objects.filter(iso2__in=countries))
-        for country in countries:
-            projects = [project for project in self.queryset if project['recipient_country_code'] == country.iso2]
-            country.total_budget = sum(Decimal(project['total_budget']) for project in projects)
-            country.total_activities = len(projects)
-            country_parameters = self.request.GET.copy()
-            country_parameters['countries'] = country.iso2
-            country.total_activities_url = '?%s' % urlencode(country_parameters, doseq=True)
-        return countries
+        totals = self._get_country_totals()
+        # the borders are fetched by the page itself, see world.views.border
+        countries = []
+        country_parameters = self.request.GET.copy()
+        for iso2, (total_activities, total_budget) in totals.items():
+            border = borders.get(iso2)
+            if border is None:
+                continue
+            country_parameters['countries'] = iso2
+            countries.append(dict(
+                border,
+                total_activities=total_activities,
+                total_budget=total_budget,
+                total_activities_url='?%s' % urlencode(country_parameters, doseq=True),
+            ))
+        return sorted(countries, key=lambda country: country['name'])
+    
+    def _get_country_totals(self):
+        """
+        Returns the number of activities and total budget per country code,
+        summed in one pass and cached for the search and the data it was
+        done on.
+        """
+        # the searches of the index don't go through connect
+        response_cache.validate(self.last_updated())
+        querydict = self.filter_querydict(self.querydict)
+        querydict['_token'] = self.data_token()
+        totals = response_cache.get('country-totals', querydict)
+        if totals is None and isinstance(self.summary, (ActivityStore, SearchSummary)):
+            totals = self.summary.country_totals()
+            response_cache.set('country-totals', querydict, totals, self.last_updated())
+        elif totals is None:
+            totals = {}
+            for project in self.summary:
+                iso = project['recipient_country_code']
+                if iso:
+                    count, budget = totals.get(iso, (0, 0))
+                    totals[iso] = (count + 1, budget + Decimal(project['total_budget']))
+            response_cache.set('country-totals', querydict, totals, self.last_updated())
+        return totals
 
 
 class BaseProjectDetailApi(ApiMixin, View):
+    # seconds the backend calls of a page may take together
+    deadline = API_DEADLINE
+    # the last_updated value of the mirror, if the page uses it
+    mirror_token = None
+    
     def get(self, request, *args, **kwargs):
         context = self.get_context_data(**kwargs)
         return self.render_to_response(context)
     
+    def data_token(self):
+        if self.mirror_token is not None:
+            return self.mirror_token
+        return self.last_updated()
+    
     def get_context_data(self, **kwargs):
         project_id = self.kwargs.get('id')
-        project = self.connect('activity/%s/' % project_id)
-        project.update(organisation=self.connect('organisation/%s/' % project['organisation_id']))
-        transactions = self.connect('transaction', activity__id=project_id)
-        policy_markers = self.connect('policymarker', activity__id=project_id, significance__gt=0, _order_by='code')
+        deadline = time.time() + self.deadline
+        
+        # only the organisation depends on another call, the rest is
+        # fetched concurrently
+        project = self.connect_async('activity/%s/' % project_id)
+        # the mirror has the transactions and policy markers of all activities
+        mirrored = SEARCH_INDEX and activity_mirror.index is not None
+        if mirrored:
+            # read first, a sync swapping the data in meanwhile only makes it newer
+            self.mirror_token = activity_mirror.token
+            transactions = activity_mirror.transactions.get(int(project_id), [])
+            policy_markers = activity_mirror.policy_markers.get(int(project_id), [])
+        else:
+            transactions = self.connect_async('transaction', activity__id=project_id)
+            policy_markers = self.connect_async('policymarker', activity__id=project_id, significance__gt=0, _order_by='code')
+        
+        # copy, the response is shared with the response cache
+        project = dict(self.wait(project, deadline))
+        organisation = self.connect_async('organisation/%s/' % project['organisation_id'])
+        project.update(organisation=self.wait(organisation, deadline, default=UNKNOWN_ORGANISATION))
+        if not mirrored:
+            transactions = self.wait(transactions, deadline, default=[])
+            policy_markers = self.wait(policy_markers, deadline, default=[])
         
         commitment_list = []
         disbursement_list = []
@@ -294,8 +591,9 @@ class BaseProjectDetailApi(ApiMixin, View):
 #List of RSR feed relations, added on the 13th of februari
 list_rsr_references = { "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/734", "http://www.akvo.org/rsr/project/574","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/734", "http://www.akvo.org/rsr/project/575","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/735", "http://www.akvo.org/rsr/project/773","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/734", "http://www.akvo.org/rsr/project/773","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/736", "http://www.akvo.org/rsr/project/773","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/734", "http://www.akvo.org/rsr/project/796","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/734", "http://www.akvo.org/rsr/project/797","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/734", "http://www.akvo.org/rsr/project/798","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/734", "http://www.akvo.org/rsr/project/799","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/734", "http://www.akvo.org/rsr/project/800","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-23872": ["http://www.akvo.org/rsr/organisation/734", "http://www.akvo.org/rsr/project/801","http://search-api.openaid.nl/projectdetail_api/660/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/13", "http://www.akvo.org/rsr/project/464","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/13", "http://www.akvo.org/rsr/project/350","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/351","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/413","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/360","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/361","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/364","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/13", "http://www.akvo.org/rsr/project/366","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/13", "http://www.akvo.org/rsr/project/367","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/387","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/389","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/392","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/398","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/393","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/397","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/394","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/403","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/404","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/401","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/439","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/440","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/441","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/442","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/443","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/444","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/445","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/446","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/447","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/456","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/456","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/459","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/459","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/462","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/462","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/464","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/469","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/474","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/475","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/476","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/477","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/487","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/488","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/468","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/490","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/13", "http://www.akvo.org/rsr/project/490","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/13", "http://www.akvo.org/rsr/project/494","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/494","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/13", "http://www.akvo.org/rsr/project/495","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/497","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/529","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/544","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/545","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/534","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/555","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/558","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/559","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/559","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/572","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/494", "http://www.akvo.org/rsr/project/529","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/35", "http://www.akvo.org/rsr/project/533","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/533","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/8", "http://www.akvo.org/rsr/project/662","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/662","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/681","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-22168": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/682","http://search-api.openaid.nl/projectdetail_api/278/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/26","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/41","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/38","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/39","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/40","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/27","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/30","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/16","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/17","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/60","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/54","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/56","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/69","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/78","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/66", "http://www.akvo.org/rsr/project/50","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/43","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/49","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/75","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/101","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/164","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/129","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/175","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/94","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/152","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/141","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/145","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/153","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/180","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/179","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/155","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/157","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/154","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/138","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/171","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/147","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/148","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/182","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/150","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/151","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/143","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/183","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/161","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/178","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/142","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/187","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/188","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/210","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/235","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/268","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/209","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/347","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/421","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/457","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/326","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/560","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/571","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/576","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/330","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/332","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/595","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/590","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/614","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/603","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/656","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/640","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/727","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/134","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-19884": ["http://www.akvo.org/rsr/organisation/43", "http://www.akvo.org/rsr/project/315","http://search-api.openaid.nl/projectdetail_api/2669/"], "NL-1-PPR-23718": ["http://www.akvo.org/rsr/organisation/464", "http://www.akvo.org/rsr/project/706","http://search-api.openaid.nl/projectdetail_api/2284/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/385","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/212","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/34", "http://www.akvo.org/rsr/project/213","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/216","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/34", "http://www.akvo.org/rsr/project/216","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/34", "http://www.akvo.org/rsr/project/277","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/294","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/296","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/312","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/314","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/317","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/320","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/321","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/313","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/316","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/322","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/323","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/327","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/328","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/318","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/331","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/336","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/337","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/343","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/348","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/349","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/339","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/34", "http://www.akvo.org/rsr/project/339","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/352","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/353","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/354","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/355","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/356","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/357","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/363","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/365","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/406","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/390","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/399","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/396","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/400","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/402","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/405","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/408","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/409","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/410","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/341","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/411","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/412","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/414","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/416","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/418","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/419","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/422","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/423","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/34", "http://www.akvo.org/rsr/project/420","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/432","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/34", "http://www.akvo.org/rsr/project/433","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/434","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/34", "http://www.akvo.org/rsr/project/435","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/436","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/405", "http://www.akvo.org/rsr/project/438","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/448","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/34", "http://www.akvo.org/rsr/project/448","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/449","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/34", "http://www.akvo.org/rsr/project/449","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/485","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/273", "http://www.akvo.org/rsr/project/486","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/483","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/34", "http://www.akvo.org/rsr/project/483","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/526","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/472","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/546","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/450","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/417","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/585","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/586","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-22163": ["http://www.akvo.org/rsr/organisation/319", "http://www.akvo.org/rsr/project/587","http://search-api.openaid.nl/projectdetail_api/1272/"], "NL-1-PPR-19499": ["http://www.akvo.org/rsr/organisation/464", "http://www.akvo.org/rsr/project/711","http://search-api.openaid.nl/projectdetail_api/1059/"] }
 
-class ProjectDetailApi(TemplateResponseMixin, BaseProjectDetailApi):
+class ProjectDetailApi(ConditionalGetMixin, PageCacheMixin, TemplateResponseMixin, BaseProjectDetailApi):
     template_name = 'website/projectdetail_api.html'
+    page_cache = page_cache
 
     def get_context_data(self, **kwargs):
         data = super(ProjectDetailApi, self).get_context_data(**kwargs)
@@ -316,6 +614,41 @@ class ProjectDetailApiCsv(BaseProjectDetailApi):
         return response
 
 
+class BackendActivityList(object):
+    """
+    The results of a search, fetched from the backend only as far as they
+    are sliced or iterated.
+    
+    Used as the object list of the paginator, so a page view only fetches
+    the shown page.
+    """
+    chunk_size = 500
+    
+    def __init__(self, view, querydict, size):
+        self.view = view
+        self.querydict = querydict
+        # not `count`, the paginator would call it
+        self.size = size
+    
+    def __len__(self):
+        return self.size
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            if start >= stop:
+                return []
+            return self.view.search(offset=start, limit=stop - start, **self.querydict)[::step]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return self[index:index + 1][0]
+    
+    def __iter__(self):
+        return self.view.iter_search(**self.querydict)
+
+
 class SortingLink(object):
     """
     Calculates the various attributes for a sorting link on the whereaid_api page
@@ -0,0 +1,140 @@
+"""
+Resolves longitude/latitude points to the countries they are in.
+
+Each polygon of every WorldBorder is put in an R-tree by its bounding box.
+A point is only tested against the prepared geometries of the countries
+with a polygon whose box contains it, so a batch of points costs a few
+tree lookups and GEOS predicates per point instead of a query each.
+"""
+import threading
+
+from django.contrib.gis.geos import Point
+
+
+class BBoxTree(object):
+    """
+    A static R-tree of (bbox, value) items, bulk loaded with the
+    Sort-Tile-Recursive algorithm. A bbox is (xmin, ymin, xmax, ymax).
+    """
+    def __init__(self, items, node_size=8):
+        self.node_size = node_size
+        # a node is (bbox, children, leaf); the children of a leaf are items
+        nodes = self._pack(list(items), leaf=True)
+        while len(nodes) > 1:
+            nodes = self._pack(nodes, leaf=False)
+        self.root = nodes[0] if nodes else None
+
+    def _pack(self, entries, leaf):
+        """
+        Groups `entries` into nodes of at most `node_size` children, in
+        vertical slices sorted by x and then by y, so that each node
+        covers a compact area.
+        """
+        if not entries:
+            return []
+        size = self.node_size
+        entries = sorted(entries, key=lambda entry: entry[0][0] + entry[0][2])
+        node_count = -(-len(entries) // size)
+        slice_count = max(1, int(node_count ** 0.5 + 0.5))
+        slice_size = -(-len(entries) // slice_count)
+        nodes = []
+        for i in range(0, len(entries), slice_size):
+            vertical_slice = sorted(entries[i:i + slice_size], key=lambda entry: entry[0][1] + entry[0][3])
+            for j in range(0, len(vertical_slice), size):
+                children = vertical_slice[j:j + size]
+                nodes.append((self._union([child[0] for child in children]), children, leaf))
+        return nodes
+
+    def _union(self, boxes):
+        return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+    def query(self, x, y):
+        """
+        Returns the values of the items whose bbox contains (x, y).
+        """
+        values = []
+        if self.root is None:
+            return values
+        stack = [self.root]
+        while stack:
+            bbox, children, leaf = stack.pop()
+            if not (bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]):
+                continue
+            if leaf:
+                for child_bbox, value in children:
+                    if child_bbox[0] <= x <= child_bbox[2] and child_bbox[1] <= y <= child_bbox[3]:
+                        values.append(value)
+            else:
+                stack.extend(children)
+        return values
+
+
+class CountryLocator(object):
+    """
+    Finds the ISO code of the country containing a point, from
+    (iso2, multipolygon) pairs.
+    """
+    def __init__(self, borders):
+        self.countries = []
+        items = []
+        for iso2, mpoly in borders:
+            index = len(self.countries)
+            prepared = mpoly.prepared
+            # GEOS builds the indexes of a prepared geometry on its first
+            # use, do that here rather than concurrently in the requests
+            prepared.covers(mpoly.point_on_surface)
+            self.countries.append((iso2, prepared))
+            for polygon in mpoly:
+                items.append((polygon.extent, index))
+        self.tree = BBoxTree(items)
+
+    def locate(self, lon, lat):
+        """
+        Returns the ISO code of the country (lon, lat) is in, or None.
+        """
+        candidates = self.tree.query(lon, lat)
+        if not candidates:
+            return None
+        point = Point(lon, lat)
+        for index in sorted(set(candidates)):
+            iso2, prepared = self.countries[index]
+            if prepared.covers(point):
+                return iso2
+        return None
+
+    def locate_many(self, points):
+        """
+        Returns the ISO code, or None, for each (lon, lat) in `points`.
+        """
+        return [self.locate(lon, lat) for lon, lat in points]
+
+
+class LazyCountryLocator(object):
+    """
+    A CountryLocator over the WorldBorder table, built on first use and
+    rebuilt after `invalidate`.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locator = None
+
+    def get(self):
+        locator = self.locator
+        if locator is None:
+            with self.lock:
+                if self.locator is None:
+                    from world.models import WorldBorder
+                    self.locator = CountryLocator(
+                        (border.iso2, border.mpoly) for border in WorldBorder.objects.only('iso2', 'mpoly'))
+                locator = self.locator
+        return locator
+
+    def invalidate(self):
+        self.locator = None
+
+    def locate_many(self, points):
+        return self.get().locate_many(points)
+
+
+country_locator = LazyCountryLocator()
@@ -0,0 +1,82 @@
+import time
+from multiprocessing import Pool, cpu_count
+from optparse import make_option
+
+from django.contrib.gis.geos import GEOSGeometry
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from world.models import WorldBorder, BORDER_LEVELS
+from world.utils import border_hash, derived_borders
+
+
+def serialize(row):
+    """
+    Runs in a worker process, so the geometry is passed as WKB.
+    """
+    pk, wkb = row
+    mpoly = GEOSGeometry(buffer(wkb))
+    return (pk, mpoly.num_coords) + derived_borders(mpoly, BORDER_LEVELS)
+
+
+class Command(BaseCommand):
+    help = 'Regenerates the columns derived from WorldBorder.mpoly for the whole table.'
+    option_list = BaseCommand.option_list + (
+        make_option('--incremental', action='store_true', dest='incremental', default=False,
+            help='Only rebuild the rows whose mpoly changed since their last rebuild.'),
+        make_option('--processes', type='int', dest='processes', default=None,
+            help='Number of worker processes, defaults to the number of CPUs.'),
+        make_option('--batch-size', type='int', dest='batch_size', default=50,
+            help='Number of rows per UPDATE batch.'),
+    )
+
+    def handle(self, *args, **options):
+        start = time.time()
+        rows = []
+        for worldborder in WorldBorder.objects.only('id', 'mpoly', 'border_hash'):
+            if options['incremental'] and worldborder.border_hash == border_hash(worldborder.mpoly):
+                continue
+            rows.append((worldborder.pk, str(worldborder.mpoly.wkb)))
+        
+        if not rows:
+            self.stdout.write('Nothing to rebuild\n')
+            return
+        
+        processes = options['processes'] or cpu_count()
+        pool = Pool(processes)
+        try:
+            results = pool.map(serialize, rows, chunksize=max(1, len(rows) / (processes * 4)))
+        finally:
+            pool.close()
+            pool.join()
+        serialized = time.time()
+        
+        self.write(results, options['batch_size'])
+        done = time.time()
+        
+        vertices = sum(result[1] for result in results)
+        serializing = max(serialized - start, 0.001)
+        self.stdout.write('Rebuilt %s rows (%s vertices) in %.1fs: serializing %.1fs, %.0f rows/s, %.0f vertices/s; writing %.1fs\n' % (
+            len(results), vertices, done - start,
+            serializing, len(results) / serializing, vertices / serializing,
+            done - serialized,
+        ))
+
+    @transaction.commit_on_success
+    def write(self, results, batch_size):
+        cursor = connection.cursor()
+        for i in range(0, len(results), batch_size):
+            batch = results[i:i + batch_size]
+            cursor.executemany(
+                'UPDATE world_worldborder SET google_border = %s, encoded_border = %s, border_hash = %s WHERE id = %s',
+                [(google_border, encoded_border, digest, pk) for pk, vertices, google_border, encoded_border, digest, simplified in batch]
+            )
+            cursor.execute(
+                'DELETE FROM world_simplifiedborder WHERE worldborder_id IN (%s)' % ','.join(['%s'] * len(batch)),
+                [result[0] for result in batch]
+            )
+            cursor.executemany(
+                'INSERT INTO world_simplifiedborder (worldborder_id, zoom, encoded_border) VALUES (%s, %s, %s)',
+                [(result[0], zoom, encoded_border) for result in batch for zoom, encoded_border in result[5]]
+            )
+        transaction.set_dirty()
@@ -0,0 +1,42 @@
+# encoding: utf-8
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        
+        # Adding field 'WorldBorder.encoded_border'
+        db.add_column('world_worldborder', 'encoded_border', self.gf('django.db.models.fields.TextField')(default='[]'), keep_default=False)
+
+
+    def backwards(self, orm):
+        
+        # Deleting field 'WorldBorder.encoded_border'
+        db.delete_column('world_worldborder', 'encoded_border')
+
+
+    models = {
+        'world.worldborder': {
+            'Meta': {'object_name': 'WorldBorder'},
+            'area': ('django.db.models.fields.IntegerField', [], {}),
+            'encoded_border': ('django.db.models.fields.TextField', [], {'default': "'[]'"}),
+            'fips': ('django.db.models.fields.CharField', [], {'max_length': '2'}),
+            'google_border': ('django.db.models.fields.TextField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'iso2': ('django.db.models.fields.CharField', [], {'max_length': '2'}),
+            'iso3': ('django.db.models.fields.CharField', [], {'max_length': '3'}),
+            'lat': ('django.db.models.fields.FloatField', [], {}),
+            'lon': ('django.db.models.fields.FloatField', [], {}),
+            'mpoly': ('django.contrib.gis.db.models.fields.MultiPolygonField', [], {}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'pop2005': ('django.db.models.fields.IntegerField', [], {}),
+            'region': ('django.db.models.fields.IntegerField', [], {}),
+            'subregion': ('django.db.models.fields.IntegerField', [], {}),
+            'un': ('django.db.models.fields.IntegerField', [], {})
+        }
+    }
+
+    complete_apps = ['world']
@@ -0,0 +1,54 @@
+# encoding: utf-8
+from south.v2 import DataMigration
+from django.utils import simplejson
+
+class Migration(DataMigration):
+    @staticmethod
+    def encode_polyline(coords):
+        "Encodes (x, y) coordinates with the Google Maps encoded polyline algorithm."
+        result = []
+        prev_lat = prev_lng = 0
+        for x, y in coords:
+            lat, lng = int(round(y * 1e5)), int(round(x * 1e5))
+            for value in (lat - prev_lat, lng - prev_lng):
+                value = ~(value << 1) if value < 0 else value << 1
+                while value >= 0x20:
+                    result.append(chr((0x20 | (value & 0x1f)) + 63))
+                    value >>= 5
+                result.append(chr(value + 63))
+            prev_lat, prev_lng = lat, lng
+        return ''.join(result)
+    
+    def forwards(self, orm):
+        for worldborder in orm.WorldBorder.objects.all():
+            worldborder.encoded_border = simplejson.dumps([self.encode_polyline(polygon[0].coords) for polygon in worldborder.mpoly])
+            worldborder.save()
+
+    def backwards(self, orm):
+        for worldborder in orm.WorldBorder.objects.all():
+            worldborder.encoded_border = '[]'
+            worldborder.save()
+
+    models = {
+        'world.worldborder': {
+            'Meta': {'object_name': 'WorldBorder'},
+            'area': ('django.db.models.fields.IntegerField', [], {}),
+            'encoded_border': ('django.db.models.fields.TextField', [], {'default': "'[]'"}),
+            'fips': ('django.db.models.fields.CharField', [], {'max_length': '2'}),
+            'google_border': ('django.db.models.fields.TextField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'iso2': ('django.db.models.fields.CharField', [], {'max_length': '2'}),
+            'iso3': ('django.db.models.fields.CharField', [], {'max_length': '3'}),
+            'lat': ('django.db.models.fields.FloatField', [], {}),
+            'lon': ('django.db.models.fields.FloatField', [], {}),
+            'mpoly': ('django.contrib.gis.db.models.fields.MultiPolygonField', [], {}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'pop2005': ('django.db.models.fields.IntegerField', [], {}),
+            'region': ('django.db.models.fields.IntegerField', [], {}),
+            'subregion': ('django.db.models.fields.IntegerField', [], {}),
+            'un': ('django.db.models.fields.IntegerField', [], {})
+        }
+    }
+
+    complete_apps = ['world']
+    
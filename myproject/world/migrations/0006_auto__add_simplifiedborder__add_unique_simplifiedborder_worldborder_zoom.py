@@ -0,0 +1,61 @@
+# encoding: utf-8
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        
+        # Adding model 'SimplifiedBorder'
+        db.create_table('world_simplifiedborder', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('worldborder', self.gf('django.db.models.fields.related.ForeignKey')(related_name='simplified_borders', to=orm['world.WorldBorder'])),
+            ('zoom', self.gf('django.db.models.fields.IntegerField')()),
+            ('encoded_border', self.gf('django.db.models.fields.TextField')()),
+        ))
+        db.send_create_signal('world', ['SimplifiedBorder'])
+
+        # Adding unique constraint on 'SimplifiedBorder', fields ['worldborder', 'zoom']
+        db.create_unique('world_simplifiedborder', ['worldborder_id', 'zoom'])
+
+
+    def backwards(self, orm):
+        
+        # Removing unique constraint on 'SimplifiedBorder', fields ['worldborder', 'zoom']
+        db.delete_unique('world_simplifiedborder', ['worldborder_id', 'zoom'])
+
+        # Deleting model 'SimplifiedBorder'
+        db.delete_table('world_simplifiedborder')
+
+
+    models = {
+        'world.simplifiedborder': {
+            'Meta': {'unique_together': "(('worldborder', 'zoom'),)", 'object_name': 'SimplifiedBorder'},
+            'encoded_border': ('django.db.models.fields.TextField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'worldborder': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'simplified_borders'", 'to': "orm['world.WorldBorder']"}),
+            'zoom': ('django.db.models.fields.IntegerField', [], {})
+        },
+        'world.worldborder': {
+            'Meta': {'object_name': 'WorldBorder'},
+            'area': ('django.db.models.fields.IntegerField', [], {}),
+            'encoded_border': ('django.db.models.fields.TextField', [], {'default': "'[]'"}),
+            'fips': ('django.db.models.fields.CharField', [], {'max_length': '2'}),
+            'google_border': ('django.db.models.fields.TextField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'iso2': ('django.db.models.fields.CharField', [], {'max_length': '2'}),
+            'iso3': ('django.db.models.fields.CharField', [], {'max_length': '3'}),
+            'lat': ('django.db.models.fields.FloatField', [], {}),
+            'lon': ('django.db.models.fields.FloatField', [], {}),
+            'mpoly': ('django.contrib.gis.db.models.fields.MultiPolygonField', [], {}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'pop2005': ('django.db.models.fields.IntegerField', [], {}),
+            'region': ('django.db.models.fields.IntegerField', [], {}),
+            'subregion': ('django.db.models.fields.IntegerField', [], {}),
+            'un': ('django.db.models.fields.IntegerField', [], {})
+        }
+    }
+
+    complete_apps = ['world']
@@ -0,0 +1,76 @@
+# encoding: utf-8
+from south.v2 import DataMigration
+from django.utils import simplejson
+
+class Migration(DataMigration):
+    # (zoom, simplification tolerance) of the borders as of this migration
+    border_levels = (
+        (0, 0.5),
+        (3, 0.1),
+        (5, 0.02),
+    )
+    
+    @staticmethod
+    def encode_polyline(coords):
+        "Encodes (x, y) coordinates with the Google Maps encoded polyline algorithm."
+        result = []
+        prev_lat = prev_lng = 0
+        for x, y in coords:
+            lat, lng = int(round(y * 1e5)), int(round(x * 1e5))
+            for value in (lat - prev_lat, lng - prev_lng):
+                value = ~(value << 1) if value < 0 else value << 1
+                while value >= 0x20:
+                    result.append(chr((0x20 | (value & 0x1f)) + 63))
+                    value >>= 5
+                result.append(chr(value + 63))
+            prev_lat, prev_lng = lat, lng
+        return ''.join(result)
+    
+    def encode_simplified(self, mpoly, tolerance):
+        "Returns the encoded borders of a topology-preserving simplification of mpoly."
+        geometry = mpoly.simplify(tolerance, preserve_topology=True)
+        if geometry.geom_type == 'Polygon':
+            geometry = [geometry]
+        return [self.encode_polyline(polygon[0].coords) for polygon in geometry]
+    
+    def forwards(self, orm):
+        for worldborder in orm.WorldBorder.objects.all():
+            for zoom, tolerance in self.border_levels:
+                orm.SimplifiedBorder.objects.create(
+                    worldborder=worldborder,
+                    zoom=zoom,
+                    encoded_border=simplejson.dumps(self.encode_simplified(worldborder.mpoly, tolerance)),
+                )
+
+    def backwards(self, orm):
+        orm.SimplifiedBorder.objects.all().delete()
+
+    models = {
+        'world.simplifiedborder': {
+            'Meta': {'unique_together': "(('worldborder', 'zoom'),)", 'object_name': 'SimplifiedBorder'},
+            'encoded_border': ('django.db.models.fields.TextField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'worldborder': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'simplified_borders'", 'to': "orm['world.WorldBorder']"}),
+            'zoom': ('django.db.models.fields.IntegerField', [], {})
+        },
+        'world.worldborder': {
+            'Meta': {'object_name': 'WorldBorder'},
+            'area': ('django.db.models.fields.IntegerField', [], {}),
+            'encoded_border': ('django.db.models.fields.TextField', [], {'default': "'[]'"}),
+            'fips': ('django.db.models.fields.CharField', [], {'max_length': '2'}),
+            'google_border': ('django.db.models.fields.TextField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'iso2': ('django.db.models.fields.CharField', [], {'max_length': '2'}),
+            'iso3': ('django.db.models.fields.CharField', [], {'max_length': '3'}),
+            'lat': ('django.db.models.fields.FloatField', [], {}),
+            'lon': ('django.db.models.fields.FloatField', [], {}),
+            'mpoly': ('django.contrib.gis.db.models.fields.MultiPolygonField', [], {}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'pop2005': ('django.db.models.fields.IntegerField', [], {}),
+            'region': ('django.db.models.fields.IntegerField', [], {}),
+            'subregion': ('django.db.models.fields.IntegerField', [], {}),
+            'un': ('django.db.models.fields.IntegerField', [], {})
+        }
+    }
+
+    complete_apps = ['world']
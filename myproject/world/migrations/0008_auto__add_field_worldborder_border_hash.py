@@ -0,0 +1,50 @@
+# encoding: utf-8
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        
+        # Adding field 'WorldBorder.border_hash'
+        db.add_column('world_worldborder', 'border_hash', self.gf('django.db.models.fields.CharField')(default='', max_length=32, blank=True), keep_default=False)
+
+
+    def backwards(self, orm):
+        
+        # Deleting field 'WorldBorder.border_hash'
+        db.delete_column('world_worldborder', 'border_hash')
+
+
+    models = {
+        'world.simplifiedborder': {
+            'Meta': {'unique_together': "(('worldborder', 'zoom'),)", 'object_name': 'SimplifiedBorder'},
+            'encoded_border': ('django.db.models.fields.TextField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'worldborder': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'simplified_borders'", 'to': "orm['world.WorldBorder']"}),
+            'zoom': ('django.db.models.fields.IntegerField', [], {})
+        },
+        'world.worldborder': {
+            'Meta': {'object_name': 'WorldBorder'},
+            'area': ('django.db.models.fields.IntegerField', [], {}),
+            'border_hash': ('django.db.models.fields.CharField', [], {'max_length': '32', 'blank': 'True'}),
+            'encoded_border': ('django.db.models.fields.TextField', [], {'default': "'[]'"}),
+            'fips': ('django.db.models.fields.CharField', [], {'max_length': '2'}),
+            'google_border': ('django.db.models.fields.TextField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'iso2': ('django.db.models.fields.CharField', [], {'max_length': '2'}),
+            'iso3': ('django.db.models.fields.CharField', [], {'max_length': '3'}),
+            'lat': ('django.db.models.fields.FloatField', [], {}),
+            'lon': ('django.db.models.fields.FloatField', [], {}),
+            'mpoly': ('django.contrib.gis.db.models.fields.MultiPolygonField', [], {}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'pop2005': ('django.db.models.fields.IntegerField', [], {}),
+            'region': ('django.db.models.fields.IntegerField', [], {}),
+            'subregion': ('django.db.models.fields.IntegerField', [], {}),
+            'un': ('django.db.models.fields.IntegerField', [], {})
+        }
+    }
+
+    complete_apps = ['world']
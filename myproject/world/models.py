@@ -1,5 +1,18 @@
 from django.contrib.gis.db import models
-from world.utils import NewGPolygon
+from django.db.models.signals import post_save, post_delete
+from world.utils import derived_borders
+from world.snapshot import borders
+from world.locator import country_locator
+
+# (lowest map zoom level, simplification tolerance in degrees) of the
+# simplified borders, coarsest first; from DETAILED_ZOOM on the full
+# encoded_border is used
+BORDER_LEVELS = (
+    (0, 0.5),
+    (3, 0.1),
+    (5, 0.02),
+)
+DETAILED_ZOOM = 7
 
 class WorldBorder(models.Model):
     # Regular Django fields corresponding to the attributes in the
@@ -24,10 +37,56 @@ class WorldBorder(models.Model):
     # mpoly converted to google map polygons
     google_border = models.TextField()
     
+    # mpoly as a JSON list of google encoded polylines, served by world.views.border
+    encoded_border = models.TextField(default='[]')
+    
+    # hash of the mpoly the columns above were derived from, see the
+    # rebuild_borders command
+    border_hash = models.CharField(max_length=32, blank=True)
+    
     def save(self, *args, **kwargs):
-        self.google_border = '[%s]' % ','.join(unicode(NewGPolygon(subregion).points) for subregion in self.mpoly)
+        self.google_border, self.encoded_border, self.border_hash, simplified = derived_borders(self.mpoly, BORDER_LEVELS)
         super(WorldBorder, self).save(*args, **kwargs)
+        self.simplified_borders.all().delete()
+        for zoom, encoded_border in simplified:
+            self.simplified_borders.create(zoom=zoom, encoded_border=encoded_border)
+    
+    def border_for_zoom(self, zoom):
+        """
+        Returns the encoded border that fits map zoom level `zoom`, the zoom
+        level it is used from and the zoom level of the next, more detailed one.
+        """
+        levels = [level for level, tolerance in BORDER_LEVELS] + [DETAILED_ZOOM]
+        for level, next_level in zip(levels, levels[1:]):
+            if zoom < next_level:
+                try:
+                    return self.simplified_borders.get(zoom=level).encoded_border, level, next_level
+                except SimplifiedBorder.DoesNotExist:
+                    break
+        return self.encoded_border, DETAILED_ZOOM, None
     
     # Returns the string representation of the model.
     def __unicode__(self):
         return self.name
+
+
+class SimplifiedBorder(models.Model):
+    """
+    A topology-preserving simplification of a WorldBorder for low map zoom
+    levels, see BORDER_LEVELS.
+    """
+    worldborder = models.ForeignKey(WorldBorder, related_name='simplified_borders')
+    # lowest map zoom level this border is used for
+    zoom = models.IntegerField()
+    encoded_border = models.TextField()
+    
+    class Meta:
+        unique_together = ('worldborder', 'zoom')
+
+
+def invalidate_border_caches(sender, **kwargs):
+    borders.invalidate()
+    country_locator.invalidate()
+
+post_save.connect(invalidate_border_caches, sender=WorldBorder)
+post_delete.connect(invalidate_border_caches, sender=WorldBorder)
@@ -0,0 +1,63 @@
+"""
+In-memory snapshot of the WorldBorder table, without the geometries.
+
+The table is static reference data of a few hundred rows, so the search
+pages read it from here instead of querying it on every request.
+"""
+import threading
+
+
+class BorderSnapshot(object):
+    """
+    The attributes of all countries by ISO code, and the ISO codes per
+    subregion. Loaded on first use; `reload` re-reads the table and
+    `invalidate` makes the next use do so, which world.models does
+    whenever a WorldBorder is saved or deleted.
+
+    The rows are shared by all threads and must not be modified.
+    """
+    fields = ('iso2', 'iso3', 'name', 'region', 'subregion', 'lon', 'lat', 'border_hash')
+
+    def __init__(self, rows=None):
+        self.lock = threading.Lock()
+        self.indexes = None
+        if rows is not None:
+            self.indexes = self._build(rows)
+
+    def reload(self):
+        from world.models import WorldBorder
+        rows = [dict(zip(self.fields, row)) for row in WorldBorder.objects.values_list(*self.fields)]
+        self.indexes = self._build(rows)
+
+    def invalidate(self):
+        self.indexes = None
+
+    def get(self, iso2, default=None):
+        return self._indexes()[0].get(iso2, default)
+
+    def subregion_of(self, iso2, default=None):
+        country = self.get(iso2)
+        return country['subregion'] if country is not None else default
+
+    def countries_in(self, subregion):
+        return self._indexes()[1].get(subregion, frozenset())
+
+    def _indexes(self):
+        indexes = self.indexes
+        if indexes is None:
+            with self.lock:
+                if self.indexes is None:
+                    self.reload()
+                indexes = self.indexes
+        return indexes
+
+    def _build(self, rows):
+        by_iso2 = {}
+        members = {}
+        for row in rows:
+            by_iso2[row['iso2']] = row
+            members.setdefault(row['subregion'], set()).add(row['iso2'])
+        return by_iso2, dict((subregion, frozenset(codes)) for subregion, codes in members.items())
+
+
+borders = BorderSnapshot()
@@ -14,3 +14,37 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class EncodePolylineTest(TestCase):
+    def test_reference_example(self):
+        """
+        The example from the Google Maps encoded polyline documentation.
+        """
+        from world.utils import encode_polyline
+        coords = [(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)]
+        self.assertEqual(encode_polyline(coords), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+
+
+class BBoxTreeTest(TestCase):
+    def test_query(self):
+        from world.locator import BBoxTree
+        # a 10x10 grid of unit boxes
+        tree = BBoxTree(((x, y, x + 1, y + 1), (x, y)) for x in range(10) for y in range(10))
+        self.assertEqual(tree.query(3.5, 7.5), [(3, 7)])
+        self.assertEqual(sorted(tree.query(3, 7)), [(2, 6), (2, 7), (3, 6), (3, 7)])
+        self.assertEqual(tree.query(11, 5), [])
+        self.assertEqual(BBoxTree([]).query(0, 0), [])
+
+
+class CountryLocatorTest(TestCase):
+    def test_locate_many(self):
+        from django.contrib.gis.geos import MultiPolygon, Polygon
+        from world.locator import CountryLocator
+        square = lambda x, y, size: Polygon(((x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)))
+        # B is the hole in A, plus an island
+        a = MultiPolygon(Polygon(square(0, 0, 10).exterior_ring, square(4, 4, 2).exterior_ring))
+        b = MultiPolygon(square(4, 4, 2), square(20, 0, 1))
+        locator = CountryLocator([('AA', a), ('BB', b)])
+        self.assertEqual(locator.locate_many([(1, 1), (5, 5), (20.5, 0.5), (15, 5), (0, 5)]),
+                         ['AA', 'BB', 'BB', None, 'AA'])
@@ -0,0 +1,7 @@
+from django.conf.urls.defaults import *
+
+
+urlpatterns = patterns('world.views',
+    (r'^borders/(?P<iso2>[A-Za-z]{2})/$', 'border'),
+    (r'^locate/$', 'locate'),
+)
@@ -1,6 +1,51 @@
 from django.contrib.gis.maps.google.overlays import GPolygon
+from django.utils import simplejson
+from django.utils.hashcompat import md5_constructor
 
 class NewGPolygon(GPolygon):
     def latlng_from_coords(self, coords):
         "Generates a JavaScript array of GLatLng objects for the given coordinates."
-        return '[%s]' % ','.join(['new google.maps.LatLng(%s,%s)' % (y, x) for x, y in coords])
\ No newline at end of file
+        return '[%s]' % ','.join(['new google.maps.LatLng(%s,%s)' % (y, x) for x, y in coords])
+
+def encode_polyline(coords):
+    "Encodes (x, y) coordinates with the Google Maps encoded polyline algorithm."
+    result = []
+    prev_lat = prev_lng = 0
+    for x, y in coords:
+        lat, lng = int(round(y * 1e5)), int(round(x * 1e5))
+        for value in (lat - prev_lat, lng - prev_lng):
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                result.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            result.append(chr(value + 63))
+        prev_lat, prev_lng = lat, lng
+    return ''.join(result)
+
+def encode_multipolygon(mpoly):
+    "Returns the encoded outer ring of each polygon, like the google_border paths."
+    return [encode_polyline(polygon[0].coords) for polygon in mpoly]
+
+
+def encode_simplified(mpoly, tolerance):
+    "Returns the encoded borders of a topology-preserving simplification of mpoly."
+    geometry = mpoly.simplify(tolerance, preserve_topology=True)
+    if geometry.geom_type == 'Polygon':
+        geometry = [geometry]
+    return encode_multipolygon(geometry)
+
+
+def border_hash(mpoly):
+    "Identifies the geometry the derived border columns were made from."
+    return md5_constructor(str(mpoly.wkb)).hexdigest()
+
+def derived_borders(mpoly, levels):
+    """
+    Returns the columns derived from mpoly: google_border, encoded_border,
+    border_hash and a list of (zoom, encoded border) for the simplification
+    `levels`.
+    """
+    google_border = '[%s]' % ','.join(unicode(NewGPolygon(subregion).points) for subregion in mpoly)
+    encoded_border = simplejson.dumps(encode_multipolygon(mpoly))
+    simplified = [(zoom, simplejson.dumps(encode_simplified(mpoly, tolerance))) for zoom, tolerance in levels]
+    return google_border, encoded_border, border_hash(mpoly), simplified
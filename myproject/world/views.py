@@ -1 +1,63 @@
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, HttpResponseBadRequest
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils import simplejson
+from django.utils.hashcompat import md5_constructor
+from django.views.decorators.csrf import csrf_exempt
+
+from world.models import WorldBorder, DETAILED_ZOOM
+from world.locator import country_locator
+
+# points per locate request
+MAX_POINTS = 10000
+
+
+def border(request, iso2):
+    """
+    Returns the border of a country as a list of encoded polylines.
+    
+    With a `zoom` parameter the border is simplified to fit that map zoom
+    level; `next_zoom` in the response tells from which zoom level on a more
+    detailed border is available. A request with the current border_hash of
+    the country as `v` parameter is cached by the browser for a long time,
+    the border at that URL doesn't change. Others are revalidated.
+    """
+    country = get_object_or_404(WorldBorder.objects.only('iso2', 'encoded_border', 'border_hash'), iso2=iso2.upper())
+    try:
+        zoom = int(request.GET.get('zoom', DETAILED_ZOOM))
+    except ValueError:
+        zoom = DETAILED_ZOOM
+    encoded_border, zoom, next_zoom = country.border_for_zoom(zoom)
+    content = simplejson.dumps(dict(iso2=country.iso2, zoom=zoom, next_zoom=next_zoom, paths=simplejson.loads(encoded_border)))
+    etag = '"%s"' % md5_constructor(content).hexdigest()
+    
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, mimetype='application/json')
+    response['ETag'] = etag
+    if country.border_hash and request.GET.get('v') == country.border_hash:
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'BORDER_MAX_AGE', 60*60*24*30))
+    else:
+        patch_cache_control(response, public=True, max_age=0)
+    return response
+
+
+@csrf_exempt
+def locate(request):
+    """
+    Returns the ISO code of the country each point is in, null for points
+    outside all countries.
+    
+    The points are given as "lon,lat|lon,lat|..." in a `points` GET or
+    POST parameter, so large batches can be POSTed.
+    """
+    points = request.REQUEST.get('points', '')
+    try:
+        points = [tuple(float(coordinate) for coordinate in point.split(',')) for point in points.split('|') if point]
+    except ValueError:
+        return HttpResponseBadRequest('points must be "lon,lat|lon,lat|..."')
+    if any(len(point) != 2 for point in points) or len(points) > MAX_POINTS:
+        return HttpResponseBadRequest('points must be at most %s "lon,lat" pairs' % MAX_POINTS)
+    return HttpResponse(simplejson.dumps(country_locator.locate_many(points)), mimetype='application/json')